@@ -8,6 +8,9 @@ from spotipy.oauth2 import SpotifyOAuth
 from spotipy.exceptions import SpotifyException
 import threading
 import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from lite_script import run_lite_script
 
 # Load configuration from secrets.json if it exists, otherwise use environment variables
@@ -97,9 +100,44 @@ def create_spotify_oauth():
         show_dialog=True
     )
 
+# One pooled HTTP session shared by every Spotify client. Clients stay per-user
+# (spotipy sends each client's token as a per-request header), but TCP/TLS
+# connections to api.spotify.com are reused across requests and jobs.
+# spotipy only installs its own retry adapter on sessions it creates, so the
+# 5xx retries are configured here. 429s are left to safe_spotify_call's shared
+# cooldown, which caps the wait instead of sleeping out any Retry-After.
+# Only idempotent methods are retried, so a read timeout on a playlist add
+# (POST) can't add the tracks twice. Retries are kept short, and once they run
+# out the last 5xx response is returned (raise_on_status=False) so spotipy
+# reports the real status instead of a synthetic "Max Retries" 429.
+SPOTIFY_HTTP_SESSION = requests.Session()
+_spotify_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+        raise_on_status=False
+    )
+)
+SPOTIFY_HTTP_SESSION.mount("https://", _spotify_adapter)
+SPOTIFY_HTTP_SESSION.mount("http://", _spotify_adapter)
+
+class SharedSessionSpotify(Spotify):
+    """
+    Spotify client that leaves SPOTIFY_HTTP_SESSION open when garbage-collected.
+    spotipy's Spotify.__del__ closes its session, which would clear the shared
+    connection pool under every other client still using it.
+    """
+    
+    def __del__(self):
+        pass
+
 def get_spotify_client(token_info):
     """Create Spotify client from token info"""
-    return Spotify(auth=token_info['access_token'])
+    return SharedSessionSpotify(auth=token_info['access_token'], requests_session=SPOTIFY_HTTP_SESSION)
 
 @app.route('/')
 def index():
@@ -490,8 +528,9 @@ def internal_error(error):
 @app.route('/api/database/search')
 def search_database():
     """Search audio_features database with extensive filters"""
+    conn = None
     try:
-        from lite_script import get_db_connection
+        from lite_script import get_db_connection, release_db_connection
         
         conn = get_db_connection()
         if not conn:
@@ -640,8 +679,6 @@ def search_database():
                     'created_at': row[14].isoformat() if row[14] else None
                 })
         
-        conn.close()
-        
         return jsonify({
             'results': results,
             'total_results': total_results,
@@ -654,13 +691,20 @@ def search_database():
         print(f"[ERROR] Database search failed: {e}")
         import traceback
         traceback.print_exc()
+        if conn is not None:
+            conn.rollback()
         return jsonify({'error': str(e)}), 500
+    finally:
+        # Always hand the connection back - a leaked one holds a pool slot for good
+        if conn is not None:
+            release_db_connection(conn)
 
 @app.route('/api/database/update/<int:track_id>', methods=['PUT'])
 def update_track(track_id):
     """Update a track in the database"""
+    conn = None
     try:
-        from lite_script import get_db_connection
+        from lite_script import get_db_connection, release_db_connection, invalidate_feature_matrix
         
         conn = get_db_connection()
         if not conn:
@@ -705,9 +749,8 @@ def update_track(track_id):
         
         with conn.cursor() as cursor:
             cursor.execute(update_query, params)
-            conn.commit()
-        
-        conn.close()
+        conn.commit()
+        invalidate_feature_matrix()
         
         return jsonify({'success': True, 'message': 'Track updated successfully'})
         
@@ -715,13 +758,19 @@ def update_track(track_id):
         print(f"[ERROR] Track update failed: {e}")
         import traceback
         traceback.print_exc()
+        if conn is not None:
+            conn.rollback()
         return jsonify({'error': str(e)}), 500
+    finally:
+        if conn is not None:
+            release_db_connection(conn)
 
 @app.route('/api/database/delete/<int:track_id>', methods=['DELETE'])
 def delete_track(track_id):
     """Delete a track from the database"""
+    conn = None
     try:
-        from lite_script import get_db_connection
+        from lite_script import get_db_connection, release_db_connection, invalidate_feature_matrix
         
         conn = get_db_connection()
         if not conn:
@@ -731,9 +780,8 @@ def delete_track(track_id):
         
         with conn.cursor() as cursor:
             cursor.execute(delete_query, (track_id,))
-            conn.commit()
-        
-        conn.close()
+        conn.commit()
+        invalidate_feature_matrix()
         
         return jsonify({'success': True, 'message': 'Track deleted successfully'})
         
@@ -741,7 +789,12 @@ def delete_track(track_id):
         print(f"[ERROR] Track deletion failed: {e}")
         import traceback
         traceback.print_exc()
+        if conn is not None:
+            conn.rollback()
         return jsonify({'error': str(e)}), 500
+    finally:
+        if conn is not None:
+            release_db_connection(conn)
 
 # ==================== END DATABASE MODIFIER API ROUTES ====================
 
@@ -14,6 +14,10 @@ import sys
 import time
 import tempfile
 import re
+import signal
+import atexit
+import threading
+import multiprocessing
 
 # Audio analysis
 try:
@@ -42,6 +46,11 @@ class YouTubeRateLimitError(Exception):
     pass
 
 
+class AudioAnalysisTimeoutError(Exception):
+    """Raised inside a worker when a track's download + analysis runs too long"""
+    pass
+
+
 # ============================================================================
 # AUDIO FEATURE EXTRACTION
 # ============================================================================
@@ -272,6 +281,7 @@ def download_and_analyze_audio(video_id, track_name, artist_name):
             'outtmpl': temp_file + '.%(ext)s',
             'quiet': True,
             'no_warnings': True,
+            'socket_timeout': AUDIO_DOWNLOAD_SOCKET_TIMEOUT,
         }
         
         # Download
@@ -343,6 +353,102 @@ def download_and_analyze_audio(video_id, track_name, artist_name):
                 pass
 
 
+# ============================================================================
+# WORKER PROCESS POOL
+# ============================================================================
+
+# Download + librosa analysis is slow and holds the GIL during feature
+# extraction, so it runs in separate worker processes. The pool is created on
+# first use so importing this module stays cheap.
+# The timeout is enforced inside the worker, from the moment it picks the track
+# up, so time spent queued behind other tracks doesn't count against it. Workers
+# are recycled every few tasks to shed anything librosa/ffmpeg leaked.
+AUDIO_WORKER_PROCESSES = int(os.environ.get("AUDIO_WORKER_PROCESSES", max(2, (os.cpu_count() or 2) // 2)))
+AUDIO_WORKER_MAX_TASKS = 25
+AUDIO_ANALYSIS_TIMEOUT = 120  # seconds per track (download + analysis), counted in the worker
+AUDIO_DOWNLOAD_SOCKET_TIMEOUT = 30  # seconds yt-dlp waits on a stalled connection
+
+_AUDIO_POOL = None
+_AUDIO_POOL_LOCK = threading.Lock()
+
+
+def get_audio_pool():
+    """
+    Get the shared audio analysis process pool, creating it on first use
+    
+    Returns:
+        multiprocessing.pool.Pool, or None if worker processes can't be started
+    """
+    global _AUDIO_POOL
+    
+    if _AUDIO_POOL is None:
+        with _AUDIO_POOL_LOCK:
+            if _AUDIO_POOL is None:
+                try:
+                    # forkserver: workers start from a clean process instead of
+                    # forking a parent that already has threads and DB connections
+                    context = multiprocessing.get_context("forkserver")
+                    _AUDIO_POOL = context.Pool(processes=AUDIO_WORKER_PROCESSES, maxtasksperchild=AUDIO_WORKER_MAX_TASKS)
+                    atexit.register(_AUDIO_POOL.terminate)
+                    print(f"[INFO] Started audio analysis pool with {AUDIO_WORKER_PROCESSES} worker processes")
+                except Exception as e:
+                    print(f"[WARN] Could not start audio worker processes ({e}) - analyzing in-process")
+                    _AUDIO_POOL = False
+    
+    return _AUDIO_POOL or None
+
+
+def _raise_analysis_timeout(signum, frame):
+    raise AudioAnalysisTimeoutError("audio download/analysis timed out")
+
+
+def _analyze_with_deadline(video_id, track_name, artist_name, timeout):
+    """
+    Run download_and_analyze_audio() under a SIGALRM deadline
+    
+    Runs in the worker process, so the clock starts when the track is picked
+    up rather than when it was queued. SIGALRM can only be installed from a
+    main thread; elsewhere (the in-process fallback under Flask) the analysis
+    runs without a deadline and relies on the download socket timeout.
+    
+    Raises:
+        AudioAnalysisTimeoutError: If the work takes longer than timeout seconds
+    """
+    use_alarm = hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+    if not use_alarm:
+        return download_and_analyze_audio(video_id, track_name, artist_name)
+    
+    previous_handler = signal.signal(signal.SIGALRM, _raise_analysis_timeout)
+    signal.alarm(timeout)
+    try:
+        return download_and_analyze_audio(video_id, track_name, artist_name)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def analyze_audio_in_worker(video_id, track_name, artist_name, timeout=AUDIO_ANALYSIS_TIMEOUT):
+    """
+    Run download_and_analyze_audio() in the worker process pool
+    
+    Falls back to running in the calling process if the pool is unavailable.
+    
+    Returns:
+        dict: Extracted audio features, or None if failed
+    
+    Raises:
+        YouTubeRateLimitError: If YouTube rate limit is hit
+        AudioAnalysisTimeoutError: If the worker spends longer than timeout seconds on it
+    """
+    pool = get_audio_pool()
+    if pool is None:
+        return _analyze_with_deadline(video_id, track_name, artist_name, timeout)
+    
+    # No .get() timeout: the deadline is enforced inside the worker, and a
+    # caller-side timeout would also count time spent waiting in the queue
+    return pool.apply_async(_analyze_with_deadline, (video_id, track_name, artist_name, timeout)).get()
+
+
 # ============================================================================
 # CONVENIENCE FUNCTIONS
 # ============================================================================
@@ -383,7 +489,7 @@ def process_track_for_db(sp, track_id):
         
         # Download and analyze
         print(f"[INFO] Analyzing audio...")
-        features = download_and_analyze_audio(video_id, track_name, artist_name)
+        features = analyze_audio_in_worker(video_id, track_name, artist_name)
         
         if not features:
             print(f"[WARN] Analysis failed")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Apply the schema changes lite_script.py's similarity search relies on.
+
+Run this from a shell (not from the web app) after deploying, and again with
+--rebuild-sum-w-x2 whenever SIMILARITY_FEATURES in lite_script.py changes:
+
+    python3 db_creation/migrate_audio_features.py
+
+Each statement runs in autocommit mode. Indexes are built CONCURRENTLY so
+inserts keep working; adding the sum_w_x2 generated column rewrites
+audio_features once and blocks writes while it runs.
+"""
+
+import argparse
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lite_script import DATABASE_URL, SUM_W_X2_EXPRESSION
+
+ADD_SUM_W_X2_SQL = (
+    "ALTER TABLE audio_features ADD COLUMN IF NOT EXISTS sum_w_x2 DOUBLE PRECISION "
+    f"GENERATED ALWAYS AS ({SUM_W_X2_EXPRESSION}) STORED"
+)
+
+MIGRATIONS = [
+    # Row term of the SQL similarity scan (see SUM_W_X2_EXPRESSION in lite_script.py)
+    ADD_SUM_W_X2_SQL,
+    # Range index behind the tempo/energy prefilter in find_most_similar_track_in_db()
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audio_features_tempo_energy ON audio_features (tempo_bpm, energy)",
+    # Genre-pool lookup by artist ID (artist_genres is keyed on artist_name)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_artist_genres_spotify_artist_id ON artist_genres (spotify_artist_id)",
+]
+
+
+def run_statement(cursor, statement):
+    """Run one migration statement, returning False (and printing why) on failure"""
+    print(f"[MIGRATE] {statement.split(' GENERATED')[0]}")
+    try:
+        cursor.execute(statement)
+        return True
+    except Exception as e:
+        # A failed CONCURRENTLY build leaves an INVALID index behind that
+        # IF NOT EXISTS would skip next time - drop it before rerunning
+        print(f"[ERROR] {e}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply audio_features schema migrations")
+    parser.add_argument('--rebuild-sum-w-x2', action='store_true',
+                        help='Drop and regenerate sum_w_x2 (needed after changing SIMILARITY_FEATURES)')
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print("[ERROR] No DATABASE_URL found in secrets.json or the environment")
+        return 1
+
+    conn = psycopg2.connect(DATABASE_URL)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+
+    statements = []
+    if args.rebuild_sum_w_x2:
+        statements.append("ALTER TABLE audio_features DROP COLUMN IF EXISTS sum_w_x2")
+    statements.extend(MIGRATIONS)
+
+    failures = 0
+    try:
+        with conn.cursor() as cursor:
+            for statement in statements:
+                if not run_statement(cursor, statement):
+                    failures += 1
+    finally:
+        conn.close()
+
+    print(f"[DONE] {len(statements) - failures}/{len(statements)} statements applied")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,24 +2,54 @@ import os
 import json
 import random
 import time
+import bisect
+import functools
+import hashlib
+import itertools
+import re
+from collections import deque
+from dataclasses import dataclass, asdict
 from datetime import datetime, timezone, timedelta
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from spotipy import Spotify
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from spotipy.exceptions import SpotifyException
 import psycopg2
+import psycopg2.errors
+import psycopg2.pool
 import sys
+import threading
+import atexit
+
+# NumPy is optional - without it similarity search uses the plain SQL scan
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    print("[WARN] numpy not available - using SQL similarity scan")
+    NUMPY_AVAILABLE = False
+
+# Optional faster JSON decoding for Last.fm / MusicBrainz responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import audio utilities (Railway-friendly, not gitignored)
 try:
     from audio_utils import (
         search_youtube,
         download_and_analyze_audio,
+        analyze_audio_in_worker,
         extract_audio_features,
         YouTubeRateLimitError,
         process_track_for_db,
-        check_audio_processing_available
+        check_audio_processing_available,
+        AUDIO_WORKER_PROCESSES
     )
     AUDIO_FEATURES_AVAILABLE = check_audio_processing_available()
 except ImportError:
@@ -31,6 +61,8 @@ except ImportError:
         raise Exception("Audio utilities not available")
     def download_and_analyze_audio(*args, **kwargs):
         raise Exception("Audio utilities not available")
+    def analyze_audio_in_worker(*args, **kwargs):
+        raise Exception("Audio utilities not available")
     def extract_audio_features(*args, **kwargs):
         raise Exception("Audio utilities not available")
     def process_track_for_db(*args, **kwargs):
@@ -39,8 +71,13 @@ except ImportError:
         return False
     class YouTubeRateLimitError(Exception):
         pass
+    AUDIO_WORKER_PROCESSES = 1
 # ==== HELPER FUNCTIONS ====
 
+# Pattern: https://open.spotify.com/{type}/{id} - the ID character class stops
+# at any ?si=... query string, so no separate split is needed
+SPOTIFY_URL_PATTERN = re.compile(r'https://open\.spotify\.com/(track|artist|album|playlist|user)/([a-zA-Z0-9]+)')
+
 def parse_spotify_url(url):
     """
     Parse a Spotify URL and extract type and ID
@@ -59,14 +96,7 @@ def parse_spotify_url(url):
         https://open.spotify.com/album/5Z9iiGl2FcIfa3BMiv6OIw?si=xxx -> ('album', '5Z9iiGl2FcIfa3BMiv6OIw')
         https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M?si=xxx -> ('playlist', '37i9dQZF1DXcBWIGoYBM5M')
     """
-    import re
-    
-    # Remove query parameters (everything after ?)
-    url = url.split('?')[0]
-    
-    # Pattern: https://open.spotify.com/{type}/{id}
-    pattern = r'https://open\.spotify\.com/(track|artist|album|playlist|user)/([a-zA-Z0-9]+)'
-    match = re.match(pattern, url)
+    match = SPOTIFY_URL_PATTERN.match(url)
     
     if match:
         return match.group(1), match.group(2)
@@ -94,7 +124,7 @@ def fetch_tracks_from_source(sp, generation_mode, source_url):
     
     if generation_mode == 'track':
         # Single track mode
-        track = safe_spotify_call(sp.track, url_id)
+        track = track_cached(sp, url_id)
         if not track:
             raise ValueError(f"Could not fetch track: {url_id}")
         source_desc = f"track '{track['name']}' by {track['artists'][0]['name']}"
@@ -102,7 +132,7 @@ def fetch_tracks_from_source(sp, generation_mode, source_url):
     
     elif generation_mode == 'artist':
         # Artist mode - get all tracks from artist's top tracks and albums
-        artist = safe_spotify_call(sp.artist, url_id)
+        artist = artist_cached(sp, url_id)
         if not artist:
             raise ValueError(f"Could not fetch artist: {url_id}")
         
@@ -110,22 +140,22 @@ def fetch_tracks_from_source(sp, generation_mode, source_url):
         tracks = []
         
         # Get top tracks (already full track objects)
-        top_tracks = safe_spotify_call(sp.artist_top_tracks, url_id, country='US')
+        top_tracks = artist_top_tracks_cached(sp, url_id)
         if top_tracks and 'tracks' in top_tracks:
             tracks.extend([t for t in top_tracks['tracks'] if t.get('id')])
         
         # Get albums and their tracks
         albums = safe_spotify_call(sp.artist_albums, url_id, limit=50, album_type='album,single')
         if albums and 'items' in albums:
-            for album in albums['items'][:10]:  # Limit to 10 albums
-                album_tracks = safe_spotify_call(sp.album_tracks, album['id'])
-                if album_tracks and 'items' in album_tracks:
-                    # Album track items need to be fetched as full tracks
-                    for track_simple in album_tracks['items']:
-                        if track_simple.get('id'):
-                            track = safe_spotify_call(sp.track, track_simple['id'])
-                            if track:
-                                tracks.append(track)
+            # One sp.albums() call returns up to 10 albums with their first page of tracks embedded
+            album_ids = [album['id'] for album in albums['items'][:10]]
+            full_albums = safe_spotify_call(sp.albums, album_ids) if album_ids else None
+            simple_track_ids = []
+            for album in (full_albums or {}).get('albums') or []:
+                if album and album.get('tracks'):
+                    simple_track_ids.extend(t['id'] for t in album['tracks'].get('items', []) if t and t.get('id'))
+            # Album track items need to be fetched as full tracks
+            tracks.extend(fetch_full_tracks(sp, simple_track_ids))
         
         return tracks, source_desc
     
@@ -136,16 +166,13 @@ def fetch_tracks_from_source(sp, generation_mode, source_url):
             raise ValueError(f"Could not fetch album: {url_id}")
         
         source_desc = f"album '{album['name']}' by {album['artists'][0]['name']}"
-        tracks = []
         
-        album_tracks = safe_spotify_call(sp.album_tracks, url_id)
-        if album_tracks and 'items' in album_tracks:
-            # Album track items need to be fetched as full tracks
-            for track_simple in album_tracks['items']:
-                if track_simple.get('id'):
-                    track = safe_spotify_call(sp.track, track_simple['id'])
-                    if track:
-                        tracks.append(track)
+        # The album object already embeds its first page of tracks
+        album_tracks = album.get('tracks') or {}
+        # Album track items need to be fetched as full tracks
+        tracks = fetch_full_tracks(
+            sp, [t['id'] for t in album_tracks.get('items', []) if t and t.get('id')]
+        )
         
         return tracks, source_desc
     
@@ -158,21 +185,15 @@ def fetch_tracks_from_source(sp, generation_mode, source_url):
         source_desc = f"playlist '{playlist['name']}' by {playlist['owner']['display_name']}"
         tracks = []
         
-        # Fetch all tracks from playlist (handle pagination)
-        offset = 0
-        while True:
-            results = safe_spotify_call(sp.playlist_items, url_id, offset=offset, limit=100)
-            if not results or not results.get('items'):
-                break
-            
-            for item in results['items']:
-                track = item.get('track')
-                if track and track.get('id'):
-                    tracks.append(track)
-            
-            if len(results['items']) < 100:
-                break
-            offset += 100
+        # Fetch all tracks from playlist (page 1 gives the total, the rest are fetched concurrently)
+        items, _ = fetch_all_pages(
+            lambda offset: safe_spotify_call(sp.playlist_items, url_id, offset=offset, limit=100),
+            100
+        )
+        for item in items:
+            track = item.get('track')
+            if track and track.get('id'):
+                tracks.append(track)
         
         return tracks, source_desc
     
@@ -190,6 +211,79 @@ def get_similar_tracks_by_audio_features_spotify_fallback(sp, seed_track_id, exi
 
 LASTFM_API_KEY = os.environ.get("LASTFM_API_KEY")
 
+# Shared keep-alive session for Last.fm so repeated lookups reuse one connection
+_LASTFM_SESSION = requests.Session()
+_LASTFM_SESSION.headers.update({"Accept-Encoding": "gzip", "User-Agent": "playlist-gen/1.0"})
+_LASTFM_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # 429 responses are retried after their Retry-After delay
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+)
+_LASTFM_SESSION.mount("http://", _LASTFM_ADAPTER)
+_LASTFM_SESSION.mount("https://", _LASTFM_ADAPTER)
+
+# Same keep-alive/retry setup for the other genre sources (MusicBrainz, Discogs);
+# each request still sends its own User-Agent header
+_GENRE_API_SESSION = requests.Session()
+_GENRE_API_SESSION.headers.update({"Accept-Encoding": "gzip"})
+_GENRE_API_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Last.fm allows 5 requests/second per API key. Start times of the most recent
+# requests are kept, so concurrent callers are paced too.
+LASTFM_REQUESTS_PER_SECOND = 5
+_LASTFM_REQUEST_TIMES = deque(maxlen=LASTFM_REQUESTS_PER_SECOND)  # time.monotonic() slots
+_LASTFM_RATE_LOCK = threading.Lock()
+
+def parse_json_response(response):
+    """Decode a JSON HTTP response body, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+# Last.fm error code for an unknown artist/track: a genuine, cacheable empty result
+LASTFM_ERROR_NOT_FOUND = 6
+
+def parse_lastfm_response(response):
+    """
+    Decode a Last.fm API response
+    
+    Raises on HTTP errors and on Last.fm error bodies (e.g. 29 rate limit
+    exceeded, 11/16 service unavailable), so cached lookups never store them.
+    
+    Returns:
+        dict: Response body, or {} when Last.fm reports the artist/track doesn't exist
+    """
+    try:
+        data = parse_json_response(response)
+    except ValueError:
+        response.raise_for_status()
+        raise
+    
+    if isinstance(data, dict) and "error" in data:
+        if data["error"] == LASTFM_ERROR_NOT_FOUND:
+            return {}
+        raise RuntimeError(f"Last.fm error {data['error']}: {data.get('message', '')}")
+    
+    response.raise_for_status()
+    return data
+
+def lastfm_throttle():
+    """Block until a Last.fm request slot is free (sliding one-second window)"""
+    with _LASTFM_RATE_LOCK:
+        now = time.monotonic()
+        slot = now
+        if len(_LASTFM_REQUEST_TIMES) == LASTFM_REQUESTS_PER_SECOND:
+            # The oldest kept slot is LASTFM_REQUESTS_PER_SECOND requests back
+            slot = max(now, _LASTFM_REQUEST_TIMES[0] + 1.0)
+        _LASTFM_REQUEST_TIMES.append(slot)
+    if slot > now:
+        time.sleep(slot - now)
+
 # Load database URL from secrets
 def load_database_url():
     """Load DATABASE_URL from secrets.json or environment"""
@@ -210,43 +304,190 @@ DATABASE_URL = load_database_url()
 
 scope = "playlist-modify-public playlist-modify-private user-library-read user-read-recently-played user-top-read"
 
+# ==== AUDIO FEATURE SIMILARITY CONFIG ====
+
+# Dimensions of the weighted Euclidean distance used for similarity matching:
+# (db column, feature key, normalization scale, weight)
+SIMILARITY_FEATURES = [
+    ('tempo_bpm', 'tempo', 200.0, 0.8),                     # Tempo (normalized by 200 bpm)
+    ('beat_regularity', 'beat_strength', 1.0, 1.2),         # Beat regularity
+    ('brightness_hz', 'spectral_centroid', 5000.0, 1.0),    # Brightness
+    ('treble_hz', 'spectral_rolloff', 10000.0, 0.7),        # Treble
+    ('fullness_hz', 'spectral_bandwidth', 5000.0, 0.6),     # Fullness
+    ('dynamic_range', 'spectral_contrast', 40.0, 0.9),      # Dynamic range
+    ('percussiveness', 'zero_crossing_rate', 1.0, 0.8),     # Percussiveness
+    ('loudness', 'rms_energy', 1.0, 0.7),                   # Loudness
+    ('warmth', 'harmonic_mean', 1.0, 1.0),                  # Warmth/harmonic
+    ('punch', 'percussive_mean', 1.0, 0.8),                 # Punch/percussive
+    ('texture', 'mfcc_mean', 1.0, 0.9),                     # Texture/MFCC
+    ('energy', 'energy', 1.0, 1.5),                         # Energy (very important)
+    ('danceability', 'danceability', 1.0, 1.3),             # Danceability (important)
+    ('mood_positive', 'valence', 1.0, 1.2),                 # Valence/mood (important)
+    ('acousticness', 'acousticness', 1.0, 1.0),             # Acousticness
+    ('instrumental', 'instrumentalness', 1.0, 0.8),         # Instrumentalness
+]
+
+# Row-only part of the expanded weighted distance:
+#   sum w*((x-q)/s)^2 = sum w*(x/s)^2 - 2*sum x*(w*q/s^2) + sum w*(q/s)^2
+# Stored as a generated column so the SQL scan only needs one dot product per row.
+# The column is created by db_creation/migrate_audio_features.py; after changing
+# SIMILARITY_FEATURES rerun it with --rebuild-sum-w-x2 so the column matches.
+SUM_W_X2_EXPRESSION = ' + '.join(
+    f"{weight} * ({column} / {scale}) * ({column} / {scale})"
+    for column, _, scale, weight in SIMILARITY_FEATURES
+)
+
 # ==== DATABASE HELPER FUNCTIONS ====
 
+# Connections are pooled so each seed/genre lookup doesn't pay for a fresh
+# TCP + auth handshake. Worker threads (candidate validation, concurrent jobs)
+# each hold a connection briefly, hence the headroom above the request count.
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get("DB_POOL_MAX_CONNECTIONS", "10"))
+# ThreadedConnectionPool raises instead of waiting when it is exhausted, so
+# checkouts first take one of DB_POOL_MAX_CONNECTIONS slots, waiting up to
+# this long for a busy worker to hand its connection back
+DB_POOL_CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT", "30"))  # seconds
+
+_DB_POOL = None
+_DB_POOL_LOCK = threading.Lock()
+_DB_POOL_SLOTS = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
+_DB_CHECKED_OUT = set()  # id() of connections handed out by get_db_connection()
+_DB_CHECKED_OUT_LOCK = threading.Lock()
+
+def _get_db_pool():
+    """Create the connection pool on first use (so importing never needs the database)"""
+    global _DB_POOL
+    if _DB_POOL is None:
+        with _DB_POOL_LOCK:
+            if _DB_POOL is None:
+                _DB_POOL = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN_CONNECTIONS,
+                    DB_POOL_MAX_CONNECTIONS,
+                    dsn=DATABASE_URL
+                )
+                atexit.register(_DB_POOL.closeall)
+    return _DB_POOL
+
 def get_db_connection():
-    """Get Postgres database connection"""
+    """
+    Get a pooled Postgres database connection
+    Hand it back with release_db_connection() instead of closing it
+    
+    Blocks for up to DB_POOL_CHECKOUT_TIMEOUT seconds while every pooled
+    connection is in use.
+    """
+    if not DATABASE_URL:
+        print("[WARN] No DATABASE_URL found - similarity matching disabled")
+        return None
+    
+    if not _DB_POOL_SLOTS.acquire(timeout=DB_POOL_CHECKOUT_TIMEOUT):
+        print(f"[ERROR] No database connection free after {DB_POOL_CHECKOUT_TIMEOUT:.0f}s "
+              f"(all {DB_POOL_MAX_CONNECTIONS} in use) - raise DB_POOL_MAX_CONNECTIONS")
+        return None
+    
     try:
-        if not DATABASE_URL:
-            print("[WARN] No DATABASE_URL found - similarity matching disabled")
-            return None
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        pool = _get_db_pool()
+        conn = pool.getconn()
+        if conn.closed:
+            # Server dropped the connection while it sat in the pool
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
     except Exception as e:
+        _DB_POOL_SLOTS.release()
         print(f"[WARN] Failed to connect to database: {e} - similarity matching disabled")
         return None
+    
+    with _DB_CHECKED_OUT_LOCK:
+        _DB_CHECKED_OUT.add(id(conn))
+    return conn
+
+def release_db_connection(conn):
+    """Return a connection from get_db_connection() to the pool"""
+    if conn is None:
+        return
+    with _DB_CHECKED_OUT_LOCK:
+        checked_out = id(conn) in _DB_CHECKED_OUT
+        _DB_CHECKED_OUT.discard(id(conn))
+    try:
+        _get_db_pool().putconn(conn, close=bool(conn.closed))
+    except Exception as e:
+        # e.g. the connection was already returned - never close it here, it
+        # may have been handed to another thread in the meantime
+        print(f"[WARN] Failed to return database connection to pool: {e}")
+    finally:
+        # Only free the slot once per checkout, even if released twice
+        if checked_out:
+            _DB_POOL_SLOTS.release()
+
+# Statement names already prepared on each server session, keyed by backend PID
+_PREPARED_STATEMENTS = {}
+
+def execute_prepared(cursor, name, sql, params):
+    """
+    Execute sql as a server-side prepared statement, so Postgres parses and
+    plans it once per connection instead of on every call.
+    
+    Args:
+        cursor: Cursor on a pooled connection
+        name: Statement name (unique per distinct sql)
+        sql: Statement using $1..$n placeholders
+        params: Parameter values, in placeholder order
+    """
+    conn = cursor.connection
+    backend_pid = conn.get_backend_pid()
+    execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+    
+    prepared = _PREPARED_STATEMENTS.setdefault(backend_pid, set())
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+        cursor.execute(execute_sql, params)
+        return
+    
+    # The backend PID may have been reused by a new session that never saw the
+    # PREPARE. Set a savepoint in the same round trip as the EXECUTE, so that
+    # case only undoes the failed EXECUTE and not the caller's uncommitted work.
+    # The savepoint is released with the caller's commit/rollback.
+    try:
+        cursor.execute("SAVEPOINT execute_prepared; " + execute_sql, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        cursor.execute("ROLLBACK TO SAVEPOINT execute_prepared")
+        cursor.execute(f"PREPARE {name} AS {sql}")
+        cursor.execute(execute_sql, params)
+
+@functools.lru_cache(maxsize=4096)
+def _fetch_lastfm_artist_genres(artist_name):
+    """
+    Cached Last.fm artist.getInfo lookup
+    Raises on network, HTTP and Last.fm API errors so only real answers are cached
+    """
+    url = "http://ws.audioscrobbler.com/2.0/"
+    params = {
+        "method": "artist.getInfo",
+        "artist": artist_name,
+        "api_key": LASTFM_API_KEY,
+        "format": "json"
+    }
+    
+    lastfm_throttle()
+    response = _LASTFM_SESSION.get(url, params=params, timeout=10)
+    data = parse_lastfm_response(response)
+    
+    if "artist" in data and "tags" in data["artist"] and "tag" in data["artist"]["tags"]:
+        tags = data["artist"]["tags"]["tag"]
+        return tuple(tag["name"].lower() for tag in tags[:5] if isinstance(tag, dict))
+    
+    return ()
 
 def get_lastfm_artist_genres(artist_name):
-    """Fetch genres from Last.fm for an artist"""
+    """Fetch genres from Last.fm for an artist (cached for the life of the process)"""
     if not LASTFM_API_KEY:
         return []
     
     try:
-        url = "http://ws.audioscrobbler.com/2.0/"
-        params = {
-            "method": "artist.getInfo",
-            "artist": artist_name,
-            "api_key": LASTFM_API_KEY,
-            "format": "json"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if "artist" in data and "tags" in data["artist"] and "tag" in data["artist"]["tags"]:
-            tags = data["artist"]["tags"]["tag"]
-            genres = [tag["name"].lower() for tag in tags[:5] if isinstance(tag, dict)]
-            return genres
-        
-        return []
+        # Last.fm matching is case-insensitive, so fold case to share cache entries
+        return list(_fetch_lastfm_artist_genres(artist_name.lower()))
     except Exception as e:
         print(f"[WARN] Last.fm genres error for {artist_name}: {e}")
         return []
@@ -254,7 +495,7 @@ def get_lastfm_artist_genres(artist_name):
 def get_spotify_artist_genres(sp, artist_name):
     """Fetch genres from Spotify for an artist"""
     try:
-        results = safe_spotify_call(sp.search, q=f"artist:{artist_name}", type="artist", limit=1)
+        results = search_artist_cached(sp, f"artist:{artist_name}")
         
         if results and "artists" in results and results["artists"]["items"]:
             artist = results["artists"]["items"][0]
@@ -266,11 +507,29 @@ def get_spotify_artist_genres(sp, artist_name):
         print(f"[WARN] Spotify genres error for {artist_name}: {e}")
         return []
 
+# Earliest time (monotonic) the next request to each genre API may start
+_GENRE_API_NEXT_SLOT = {}
+_GENRE_API_THROTTLE_LOCK = threading.Lock()
+
+def genre_api_throttle(service, min_interval=1.0):
+    """
+    Space requests to a genre API at least min_interval seconds apart
+    
+    Only waits when the previous request was recent, instead of sleeping a
+    full interval before every call. Concurrent callers get successive slots.
+    """
+    with _GENRE_API_THROTTLE_LOCK:
+        now = time.monotonic()
+        slot = max(now, _GENRE_API_NEXT_SLOT.get(service, 0.0))
+        _GENRE_API_NEXT_SLOT[service] = slot + min_interval
+    if slot > now:
+        time.sleep(slot - now)
+
 def get_musicbrainz_artist_genres(artist_name):
     """Fetch genres from MusicBrainz with rate limiting"""
     try:
         # MusicBrainz requires 1 req/sec rate limit
-        time.sleep(1.0)
+        genre_api_throttle("musicbrainz")
         
         url = "https://musicbrainz.org/ws/2/artist/"
         params = {
@@ -282,8 +541,8 @@ def get_musicbrainz_artist_genres(artist_name):
             "User-Agent": "PlaylistGenerator/1.0 (genre-fetcher)"
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        data = response.json()
+        response = _GENRE_API_SESSION.get(url, params=params, headers=headers, timeout=10)
+        data = parse_json_response(response)
         
         if "artists" in data and len(data["artists"]) > 0:
             artist = data["artists"][0]
@@ -304,7 +563,7 @@ def get_discogs_artist_genres(artist_name):
     """Fetch genres from Discogs API"""
     try:
         # Discogs rate limit: 60 requests per minute
-        time.sleep(1.0)
+        genre_api_throttle("discogs")
         
         url = "https://api.discogs.com/database/search"
         params = {
@@ -316,10 +575,10 @@ def get_discogs_artist_genres(artist_name):
             "User-Agent": "PlaylistGenerator/1.0"
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _GENRE_API_SESSION.get(url, params=params, headers=headers, timeout=10)
         
         if response.status_code == 200:
-            data = response.json()
+            data = parse_json_response(response)
             
             if "results" in data and len(data["results"]) > 0:
                 result = data["results"][0]
@@ -346,8 +605,6 @@ def clean_genre(genre):
     3. Replace spaces with hyphens
     4. Remove leading/trailing whitespace
     """
-    import re
-    
     # Convert to lowercase and strip
     genre = genre.lower().strip()
     
@@ -370,21 +627,21 @@ def clean_genre(genre):
     
     return genre
 
+# Common single-word genres (after normalization)
+COMMON_GENRES = frozenset({
+    'pop', 'rock', 'hip-hop', 'rap', 'rnb', 'r-and-b',
+    'electronic', 'edm', 'dance', 'j-pop', 'jpop', 'k-pop', 'kpop',
+    'house', 'alternative', 'indie', 'country', 'jazz', 'blues', 'emo',
+    'classical', 'metal', 'punk', 'reggae', 'folk', 'soul', 'funk'
+})
+
 def is_common_genre(genre):
     """
     Check if a genre is a common/generic genre (single word, highly popular)
     Common genres are those that are very broad and appear frequently
     """
-    # List of common single-word genres (after normalization)
-    common_genres = {
-        'pop', 'rock', 'hip-hop', 'rap', 'rnb', 'r-and-b',
-        'electronic', 'edm', 'dance', 'j-pop', 'jpop', 'k-pop', 'kpop',
-        'house', 'alternative', 'indie', 'country', 'jazz', 'blues', 'emo',
-        'classical', 'metal', 'punk', 'reggae', 'folk', 'soul', 'funk'
-    }
-    
     genre_normalized = normalize_genre(genre) if genre else ''
-    return genre_normalized in common_genres
+    return genre_normalized in COMMON_GENRES
 
 def filter_genre_pool_by_frequency(genre_list, min_occurrences=2):
     """
@@ -408,88 +665,90 @@ def filter_genre_pool_by_frequency(genre_list, min_occurrences=2):
     
     return filtered_genres
 
+# Common genre spellings (after cleaning) mapped to one canonical name
+GENRE_MAPPINGS = {
+    "hiphop": "hip-hop",
+    "rnb": "rnb",
+    "randb": "rnb",
+    "rhythmandblues": "rnb",
+    "electronicdancemusic": "edm",
+    "drumandbass": "drum-n-bass",
+    "drumnbass": "drum-n-bass",
+    "poprock": "pop-rock",
+    "indierock": "indie-rock",
+    "alternativerock": "alt-rock",
+    "altrock": "alt-rock",
+    "hardrock": "hard-rock",
+    "heavymetal": "metal",
+    "deathmetal": "death-metal",
+    "blackmetal": "black-metal",
+    "thrashmetal": "thrash-metal",
+    "powermetal": "power-metal",
+    "progressivemetal": "progressive-metal",
+    "progmetal": "progressive-metal",
+}
+
+@functools.lru_cache(maxsize=4096)
 def normalize_genre(genre):
     """
     Normalize genre names for better matching
     First cleans the genre, then applies common mappings
+    
+    Genre strings repeat heavily across candidates, so results are memoised.
     """
     genre = clean_genre(genre)
-    
-    # Common mappings (after cleaning)
-    mappings = {
-        "hiphop": "hip-hop",
-        "rnb": "rnb",
-        "randb": "rnb",
-        "rhythmandblues": "rnb",
-        "electronicdancemusic": "edm",
-        "drumandbass": "drum-n-bass",
-        "drumnbass": "drum-n-bass",
-        "poprock": "pop-rock",
-        "indierock": "indie-rock",
-        "alternativerock": "alt-rock",
-        "altrock": "alt-rock",
-        "hardrock": "hard-rock",
-        "heavymetal": "metal",
-        "deathmetal": "death-metal",
-        "blackmetal": "black-metal",
-        "thrashmetal": "thrash-metal",
-        "powermetal": "power-metal",
-        "progressivemetal": "progressive-metal",
-        "progmetal": "progressive-metal",
-    }
-    
-    return mappings.get(genre, genre)
+    return GENRE_MAPPINGS.get(genre, genre)
+
+# Genre hierarchy and variants
+GENRE_EXPANSIONS = {
+    'deathcore': ['metal', 'metalcore', 'death-metal'],
+    'metalcore': ['metal', 'hardcore'],
+    'death-metal': ['metal', 'extreme-metal'],
+    'black-metal': ['metal', 'extreme-metal'],
+    'thrash-metal': ['metal', 'speed-metal'],
+    'doom-metal': ['metal', 'stoner-rock'],
+    'power-metal': ['metal', 'symphonic-metal'],
+    'progressive-metal': ['metal', 'prog-rock'],
+    'indie-rock': ['indie', 'rock', 'alternative'],
+    'alt-rock': ['alternative', 'rock'],
+    'garage-rock': ['rock', 'indie-rock'],
+    'post-punk': ['punk', 'alternative'],
+    'punk-rock': ['punk', 'rock'],
+    'pop-punk': ['punk', 'pop-rock'],
+    'emo': ['punk', 'alternative'],
+    'screamo': ['punk', 'emo', 'hardcore'],
+    'indie-pop': ['indie', 'pop'],
+    'dream-pop': ['indie', 'shoegaze'],
+    'synth-pop': ['pop', 'electronic'],
+    'electro-pop': ['pop', 'electronic'],
+    'dance-pop': ['pop', 'dance'],
+    'hip-hop': ['rap', 'urban'],
+    'trap': ['hip-hop', 'rap'],
+    'drill': ['hip-hop', 'trap'],
+    'rnb': ['soul', 'urban'],
+    'neo-soul': ['soul', 'rnb'],
+    'funk': ['soul', 'disco'],
+    'house': ['electronic', 'dance'],
+    'techno': ['electronic', 'dance'],
+    'edm': ['electronic', 'dance'],
+    'dubstep': ['electronic', 'bass'],
+    'drum-n-bass': ['electronic', 'jungle'],
+    'ambient': ['electronic', 'experimental'],
+    'folk-rock': ['folk', 'rock'],
+    'country-rock': ['country', 'rock'],
+    'blues-rock': ['blues', 'rock'],
+    'jazz-fusion': ['jazz', 'fusion'],
+    'smooth-jazz': ['jazz', 'easy-listening'],
+}
 
 def expand_genre_variants(genres):
     """Expand genres to include common variants and parent genres"""
     expanded = set(genres)
     
-    # Genre hierarchy and variants
-    expansions = {
-        'deathcore': ['metal', 'metalcore', 'death-metal'],
-        'metalcore': ['metal', 'hardcore'],
-        'death-metal': ['metal', 'extreme-metal'],
-        'black-metal': ['metal', 'extreme-metal'],
-        'thrash-metal': ['metal', 'speed-metal'],
-        'doom-metal': ['metal', 'stoner-rock'],
-        'power-metal': ['metal', 'symphonic-metal'],
-        'progressive-metal': ['metal', 'prog-rock'],
-        'indie-rock': ['indie', 'rock', 'alternative'],
-        'alt-rock': ['alternative', 'rock'],
-        'garage-rock': ['rock', 'indie-rock'],
-        'post-punk': ['punk', 'alternative'],
-        'punk-rock': ['punk', 'rock'],
-        'pop-punk': ['punk', 'pop-rock'],
-        'emo': ['punk', 'alternative'],
-        'screamo': ['punk', 'emo', 'hardcore'],
-        'indie-pop': ['indie', 'pop'],
-        'dream-pop': ['indie', 'shoegaze'],
-        'synth-pop': ['pop', 'electronic'],
-        'electro-pop': ['pop', 'electronic'],
-        'dance-pop': ['pop', 'dance'],
-        'hip-hop': ['rap', 'urban'],
-        'trap': ['hip-hop', 'rap'],
-        'drill': ['hip-hop', 'trap'],
-        'rnb': ['soul', 'urban'],
-        'neo-soul': ['soul', 'rnb'],
-        'funk': ['soul', 'disco'],
-        'house': ['electronic', 'dance'],
-        'techno': ['electronic', 'dance'],
-        'edm': ['electronic', 'dance'],
-        'dubstep': ['electronic', 'bass'],
-        'drum-n-bass': ['electronic', 'jungle'],
-        'ambient': ['electronic', 'experimental'],
-        'folk-rock': ['folk', 'rock'],
-        'country-rock': ['country', 'rock'],
-        'blues-rock': ['blues', 'rock'],
-        'jazz-fusion': ['jazz', 'fusion'],
-        'smooth-jazz': ['jazz', 'easy-listening'],
-    }
-    
     for genre in list(expanded):
         normalized = normalize_genre(genre)
-        if normalized in expansions:
-            expanded.update(expansions[normalized])
+        if normalized in GENRE_EXPANSIONS:
+            expanded.update(GENRE_EXPANSIONS[normalized])
     
     return list(expanded)
 
@@ -528,11 +787,30 @@ def merge_and_rank_genres(spotify_genres, lastfm_genres, musicbrainz_genres, dis
     
     return genre_list
 
+# Genres already resolved by get_artist_genres_live() in this process, so
+# repeat artists skip the artist_genres round trip
+ARTIST_GENRES_CACHE_MAX_ENTRIES = 4096
+_ARTIST_GENRES_CACHE = {}
+_ARTIST_GENRES_CACHE_LOCK = threading.Lock()
+
+def _remember_artist_genres(artist_name, genres):
+    """Store resolved genres in the in-process cache, evicting the oldest entry when full"""
+    with _ARTIST_GENRES_CACHE_LOCK:
+        _ARTIST_GENRES_CACHE.pop(artist_name, None)
+        if len(_ARTIST_GENRES_CACHE) >= ARTIST_GENRES_CACHE_MAX_ENTRIES:
+            _ARTIST_GENRES_CACHE.pop(next(iter(_ARTIST_GENRES_CACHE)))
+        _ARTIST_GENRES_CACHE[artist_name] = tuple(genres)
+
 def get_artist_genres_live(sp, artist_name):
     """
     Fetch genres for an artist - checks database first, then fetches from APIs if needed
     Returns list of genres (saves to database with artist_id after fetching from APIs)
     """
+    with _ARTIST_GENRES_CACHE_LOCK:
+        cached_genres = _ARTIST_GENRES_CACHE.get(artist_name)
+    if cached_genres is not None:
+        return list(cached_genres)
+    
     print(f"[GENRE] Fetching genres for: {artist_name}")
     
     # Step 1: Check database first
@@ -541,8 +819,10 @@ def get_artist_genres_live(sp, artist_name):
         conn = get_db_connection()
         if conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT genres FROM artist_genres WHERE artist_name = %s",
+                execute_prepared(
+                    cursor,
+                    'select_artist_genres',
+                    "SELECT genres FROM artist_genres WHERE artist_name = $1",
                     (artist_name,)
                 )
                 result = cursor.fetchone()
@@ -550,6 +830,7 @@ def get_artist_genres_live(sp, artist_name):
                 if result and result[0]:
                     genres = result[0]  # PostgreSQL returns array as list
                     print(f"  Database: {genres} ({len(genres)} genres)")
+                    _remember_artist_genres(artist_name, genres)
                     return genres
                 else:
                     print(f"  Database: No genres found")
@@ -557,13 +838,13 @@ def get_artist_genres_live(sp, artist_name):
         print(f"[WARN] Database check failed: {e}")
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
     
     # Step 2: Fetch artist ID and genres from Spotify first
     print(f"[GENRE] Fetching from APIs...")
     artist_id = None
     try:
-        results = safe_spotify_call(sp.search, q=f"artist:{artist_name}", type="artist", limit=1)
+        results = search_artist_cached(sp, f"artist:{artist_name}")
         if results and "artists" in results and results["artists"]["items"]:
             artist = results["artists"]["items"][0]
             artist_id = artist.get("id")
@@ -608,6 +889,7 @@ def get_artist_genres_live(sp, artist_name):
                 conn.commit()
                 if top_genres:
                     print(f"  Saved {len(top_genres)} genres + artist ID to database")
+                    _remember_artist_genres(artist_name, top_genres)
                 else:
                     print(f"  Saved artist ID to database (no genres found)")
     except Exception as e:
@@ -616,7 +898,7 @@ def get_artist_genres_live(sp, artist_name):
             conn.rollback()
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
     
     return top_genres
 
@@ -695,13 +977,7 @@ def check_genre_match(genre_pool, candidate_genres, min_matches=1, max_common_ge
         print(f"  → {len(niche_matches)} niche + {min(len(common_matches), max_common_genres)} common")
         return (False, final_matches)
 
-def add_track_to_audio_features_db(conn, track_id, artist_name, track_name, spotify_uri, popularity, features, youtube_title):
-    """
-    Add a track's audio features to the database
-    Note: Genre fetching is done live during recommendation generation using get_artist_genres_live()
-    """
-    insert_sql = """
-    INSERT INTO audio_features (
+AUDIO_FEATURES_INSERT_COLUMNS = """
         spotify_track_id, artist_name, track_name,
         tempo_bpm, key_musical, beat_regularity,
         brightness_hz, treble_hz, fullness_hz, dynamic_range,
@@ -710,63 +986,174 @@ def add_track_to_audio_features_db(conn, track_id, artist_name, track_name, spot
         texture,
         energy, danceability, mood_positive, acousticness, instrumental,
         popularity, spotify_uri, youtube_match
-    ) VALUES (
-        %s, %s, %s,
-        %s, %s, %s,
-        %s, %s, %s, %s,
-        %s, %s,
-        %s, %s,
-        %s,
-        %s, %s, %s, %s, %s,
-        %s, %s, %s
+"""
+
+# Server-side prepared insert (parsed and planned once per connection)
+INSERT_AUDIO_FEATURES_SQL = f"""
+    INSERT INTO audio_features ({AUDIO_FEATURES_INSERT_COLUMNS}) VALUES (
+        $1, $2, $3,
+        $4, $5, $6,
+        $7, $8, $9, $10,
+        $11, $12,
+        $13, $14,
+        $15,
+        $16, $17, $18, $19, $20,
+        $21, $22, $23
     )
     ON CONFLICT (spotify_track_id) DO NOTHING
     RETURNING id
+"""
+
+def _audio_features_row(track_id, artist_name, track_name, spotify_uri, popularity, features, youtube_title):
+    """Build the parameter tuple for one audio_features row (AUDIO_FEATURES_INSERT_COLUMNS order)"""
+    return (
+        track_id,
+        artist_name,
+        track_name,
+        # Rhythm
+        features.get('tempo', 0),
+        features.get('key_estimate', 0),
+        features.get('beat_strength', 0),
+        # Spectral
+        features.get('spectral_centroid', 0),
+        features.get('spectral_rolloff', 0),
+        features.get('spectral_bandwidth', 0),
+        features.get('spectral_contrast', 0),
+        # Temporal
+        features.get('zero_crossing_rate', 0),
+        features.get('rms_energy', 0),
+        # Harmonic/Percussive
+        features.get('harmonic_mean', 0),
+        features.get('percussive_mean', 0),
+        # Timbral
+        features.get('mfcc_mean', 0),
+        # Computed
+        features.get('energy', 0),
+        features.get('danceability', 0),
+        features.get('valence', 0),
+        features.get('acousticness', 0),
+        features.get('instrumentalness', 0),
+        # Metadata
+        popularity,
+        spotify_uri,
+        youtube_title
+    )
+
+def add_track_to_audio_features_db(conn, track_id, artist_name, track_name, spotify_uri, popularity, features, youtube_title):
+    """
+    Add a track's audio features to the database
+    Note: Genre fetching is done live during recommendation generation using get_artist_genres_live()
     """
-    
     try:
         with conn.cursor() as cursor:
-            cursor.execute(insert_sql, (
-                track_id,
-                artist_name,
-                track_name,
-                # Rhythm
-                round(features.get('tempo', 0), 6),
-                features.get('key_estimate', 0),
-                round(features.get('beat_strength', 0), 6),
-                # Spectral
-                round(features.get('spectral_centroid', 0), 6),
-                round(features.get('spectral_rolloff', 0), 6),
-                round(features.get('spectral_bandwidth', 0), 6),
-                round(features.get('spectral_contrast', 0), 6),
-                # Temporal
-                round(features.get('zero_crossing_rate', 0), 6),
-                round(features.get('rms_energy', 0), 6),
-                # Harmonic/Percussive
-                round(features.get('harmonic_mean', 0), 6),
-                round(features.get('percussive_mean', 0), 6),
-                # Timbral
-                round(features.get('mfcc_mean', 0), 6),
-                # Computed
-                round(features.get('energy', 0), 6),
-                round(features.get('danceability', 0), 6),
-                round(features.get('valence', 0), 6),
-                round(features.get('acousticness', 0), 6),
-                round(features.get('instrumentalness', 0), 6),
-                # Metadata
-                popularity,
-                spotify_uri,
-                youtube_title
-            ))
+            execute_prepared(
+                cursor,
+                'insert_audio_features',
+                INSERT_AUDIO_FEATURES_SQL,
+                _audio_features_row(track_id, artist_name, track_name, spotify_uri, popularity, features, youtube_title)
+            )
             conn.commit()
             result = cursor.fetchone()
+            if result:
+                append_to_feature_matrix([(
+                    (track_id, artist_name, track_name, spotify_uri, popularity, youtube_title),
+                    features
+                )])
             return result[0] if result else None
     except Exception as e:
         print(f"[ERROR] Failed to insert track into database: {e}")
         conn.rollback()
         return None
 
-def ensure_track_in_db(sp, conn, track_id):
+def add_tracks_to_audio_features_db(conn, tracks, page_size=100):
+    """
+    Bulk version of add_track_to_audio_features_db() - one statement per page
+    and a single commit for the whole batch
+    
+    Args:
+        conn: Database connection
+        tracks: List of (track_info, features) tuples as returned by process_track_for_db()
+        page_size: Rows per INSERT statement
+    
+    Returns:
+        int: Number of rows inserted (existing tracks are skipped)
+    """
+    if not tracks:
+        return 0
+    
+    from psycopg2.extras import execute_values
+    
+    rows = [
+        _audio_features_row(
+            track_info['track_id'],
+            track_info['artist_name'],
+            track_info['track_name'],
+            track_info['spotify_uri'],
+            track_info['popularity'],
+            features,
+            track_info['youtube_title']
+        )
+        for track_info, features in tracks
+    ]
+    
+    try:
+        with conn.cursor() as cursor:
+            inserted = execute_values(
+                cursor,
+                f"""
+                INSERT INTO audio_features ({AUDIO_FEATURES_INSERT_COLUMNS}) VALUES %s
+                ON CONFLICT (spotify_track_id) DO NOTHING
+                RETURNING spotify_track_id
+                """,
+                rows,
+                page_size=page_size,
+                fetch=True
+            )
+        conn.commit()
+        inserted_ids = {row[0] for row in inserted}
+        append_to_feature_matrix([
+            (
+                (track_info['track_id'], track_info['artist_name'], track_info['track_name'],
+                 track_info['spotify_uri'], track_info['popularity'], track_info['youtube_title']),
+                features
+            )
+            for track_info, features in tracks
+            if track_info['track_id'] in inserted_ids
+        ])
+        return len(inserted)
+    except Exception as e:
+        print(f"[ERROR] Failed to bulk insert {len(rows)} tracks into database: {e}")
+        conn.rollback()
+        return 0
+
+def find_tracks_in_db(conn, track_ids):
+    """
+    Check which of many tracks already have audio features, in one query
+    
+    Args:
+        conn: Database connection
+        track_ids: Iterable of Spotify track IDs
+    
+    Returns:
+        set: The track IDs that are present in audio_features (empty on error)
+    """
+    track_ids = list(track_ids)
+    if not track_ids:
+        return set()
+    
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT spotify_track_id FROM audio_features WHERE spotify_track_id = ANY(%s)",
+                (track_ids,)
+            )
+            return {row[0] for row in cursor.fetchall()}
+    except Exception as e:
+        print(f"[WARN] Batch database check failed: {e}")
+        conn.rollback()
+        return set()
+
+def ensure_track_in_db(sp, conn, track_id, tracks_in_db=None, failed_track_ids=None):
     """
     Ensure a track is in the database. If not, process and add it.
     Railway-friendly: Works in serverless environment with limited storage.
@@ -775,6 +1162,10 @@ def ensure_track_in_db(sp, conn, track_id):
         sp: Spotify client
         conn: Database connection
         track_id: Spotify track ID
+        tracks_in_db: Optional set from find_tracks_in_db(); known tracks skip the
+                      existence query and newly added ones are recorded in it
+        failed_track_ids: Optional set of tracks that already failed to process this
+                          run; they are skipped, and new failures are recorded in it
     
     Returns:
         True if track is in database (or was successfully added), False otherwise
@@ -783,13 +1174,23 @@ def ensure_track_in_db(sp, conn, track_id):
         print("[WARN] Audio processing not available - skipping DB check")
         return False
     
+    if tracks_in_db is not None and track_id in tracks_in_db:
+        print(f"[DB CHECK] ✅ Track {track_id[:10]}... already in database")
+        return True
+    
+    if failed_track_ids is not None and track_id in failed_track_ids:
+        print(f"[SKIP] Track {track_id[:10]}... already failed to process this run")
+        return False
+    
     # Check if track already exists
     print(f"[DB CHECK] Querying database for track {track_id[:10]}...")
     start_time = time.time()
     try:
         with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT id FROM audio_features WHERE spotify_track_id = %s",
+            execute_prepared(
+                cursor,
+                'select_track_exists',
+                "SELECT id FROM audio_features WHERE spotify_track_id = $1",
                 (track_id,)
             )
             result = cursor.fetchone()
@@ -818,6 +1219,8 @@ def ensure_track_in_db(sp, conn, track_id):
         
         if not track_info or not features:
             print(f"[WARN] Could not process track {track_id}")
+            if failed_track_ids is not None:
+                failed_track_ids.add(track_id)
             return False
         
         # Add to database using add_track_to_audio_features_db
@@ -834,6 +1237,8 @@ def ensure_track_in_db(sp, conn, track_id):
         
         if success:
             print(f"[INFO] ✅ Successfully added track {track_id} to database")
+            if tracks_in_db is not None:
+                tracks_in_db.add(track_id)
         
         return success
     except YouTubeRateLimitError:
@@ -843,24 +1248,161 @@ def ensure_track_in_db(sp, conn, track_id):
         print(f"[ERROR] Failed to process track {track_id}: {e}")
         return False
 
-def find_most_similar_track_in_db(conn, features, liked_track_ids, max_results=10):
+def process_tracks_batch(sp, conn, track_ids, tracks_in_db, max_workers=None, failed_track_ids=None):
     """
-    Find the most mathematically similar tracks in the database
-    Uses Euclidean distance across all audio feature columns
-    Excludes tracks the user has already liked
-    Returns multiple results so we can validate them
+    Analyse several missing tracks concurrently and bulk-insert the results
+    
+    Each track's YouTube search runs in its own thread while download + analysis
+    go to the audio worker processes, so up to max_workers tracks are in flight.
+    A YouTube rate limit cancels the tracks that haven't started yet.
+    
+    Args:
+        sp: Spotify client
+        conn: Database connection
+        track_ids: Spotify track IDs to make sure are in the database
+        tracks_in_db: Set from find_tracks_in_db(); updated with the tracks added
+        max_workers: Tracks processed at once (defaults to AUDIO_WORKER_PROCESSES)
+        failed_track_ids: Optional set of tracks that already failed to process this
+                          run; they are skipped, and new failures are recorded in it
+    
+    Returns:
+        int: Number of tracks added to the database
     """
-    if not features:
-        return []
+    if not AUDIO_FEATURES_AVAILABLE:
+        return 0
+    
+    failed_track_ids = failed_track_ids if failed_track_ids is not None else set()
+    missing = [tid for tid in dict.fromkeys(track_ids) if tid not in tracks_in_db and tid not in failed_track_ids]
+    if not missing:
+        return 0
+    
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    
+    print(f"[INFO] Pre-processing {len(missing)} seed tracks concurrently...")
+    processed = []
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or AUDIO_WORKER_PROCESSES, len(missing)))
+    try:
+        futures = {executor.submit(process_track_for_db, sp, tid): tid for tid in missing}
+        for future in as_completed(futures):
+            try:
+                track_info, features = future.result()
+            except YouTubeRateLimitError:
+                print("[ERROR] YouTube rate limit hit - cancelling remaining seed processing")
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+            except Exception as e:
+                print(f"[ERROR] Failed to process track {futures[future]}: {e}")
+                failed_track_ids.add(futures[future])
+                continue
+            if track_info and features:
+                processed.append((track_info, features))
+            else:
+                # Not found on YouTube / analysis failed - don't retry it later this run
+                failed_track_ids.add(futures[future])
+    finally:
+        executor.shutdown(wait=True)
+    
+    if not processed:
+        return 0
+    
+    added = add_tracks_to_audio_features_db(conn, processed)
+    if added:
+        # Rows that already existed (ON CONFLICT) are also in the database now
+        tracks_in_db.update(track_info['track_id'] for track_info, _ in processed)
+    print(f"[INFO] ✅ Added {added} pre-processed seed tracks to database")
+    return added
+
+AUDIO_FEATURES_SELECT_SQL = """
+    SELECT tempo_bpm, key_musical, beat_regularity, brightness_hz, treble_hz, fullness_hz, dynamic_range,
+           percussiveness, loudness, warmth, punch, texture,
+           energy, danceability, mood_positive, acousticness, instrumental
+    FROM audio_features
+    WHERE spotify_track_id = %s
+"""
+
+def fetch_track_features_from_db(conn, track_id):
+    """
+    Read a track's stored audio features
     
-    # Build the exclusion list for SQL
-    exclusion_clause = ""
-    if liked_track_ids:
-        placeholders = ','.join(['%s'] * len(liked_track_ids))
-        exclusion_clause = f"AND spotify_track_id NOT IN ({placeholders})"
+    Returns:
+        dict: Features keyed like extract_audio_features() output, or None if the track isn't in the database
+    """
+    with conn.cursor() as cursor:
+        execute_prepared(cursor, 'select_track_features', _numbered_placeholders(AUDIO_FEATURES_SELECT_SQL), (track_id,))
+        row = cursor.fetchone()
+    
+    if not row:
+        return None
+    
+    return {
+        'tempo': row[0],
+        'key_estimate': row[1],
+        'beat_strength': row[2],
+        'spectral_centroid': row[3],
+        'spectral_rolloff': row[4],
+        'spectral_bandwidth': row[5],
+        'spectral_contrast': row[6],
+        'zero_crossing_rate': row[7],
+        'rms_energy': row[8],
+        'harmonic_mean': row[9],
+        'percussive_mean': row[10],
+        'mfcc_mean': row[11],
+        'energy': row[12],
+        'danceability': row[13],
+        'valence': row[14],
+        'acousticness': row[15],
+        'instrumentalness': row[16]
+    }
+
+@functools.lru_cache(maxsize=256)
+def _numbered_placeholders(sql):
+    """Convert psycopg2 %s placeholders to the $1..$n form PREPARE expects"""
+    parts = sql.split('%s')
+    return parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+
+# Prefilter windows (tempo bpm, energy) tried in order until one holds enough
+# candidates; None means a full scan. Tempo and energy carry the most weight,
+# so close matches almost always fall inside the first window. The window only
+# finds candidates: the final query uses a window derived from the k-th best
+# distance (see _exact_prefilter_window()), so results match a full scan.
+SIMILARITY_PREFILTER_WINDOWS = [(20.0, 0.15), (40.0, 0.3), None]
+# Slack on the derived window so float rounding in the expanded distance can't
+# push a true match just outside it
+SIMILARITY_WINDOW_MARGIN = 1.001
+
+def _exact_prefilter_window(distance):
+    """
+    Smallest tempo/energy window guaranteed to contain every track within distance
     
+    A track whose tempo differs from the seed's by more than
+    scale * distance / sqrt(weight) is further away than distance on the tempo
+    term alone (likewise energy), so no track outside this window can beat it.
+    """
+    bounds = {key: scale * distance * SIMILARITY_WINDOW_MARGIN / weight ** 0.5
+              for _, key, scale, weight in SIMILARITY_FEATURES if key in ('tempo', 'energy')}
+    return (bounds['tempo'], bounds['energy'])
+
+def _similarity_prefilter(features, window):
+    """Build the tempo/energy range clause and its params for one prefilter window"""
+    if window is None:
+        return "", []
+    
+    tempo_window, energy_window = window
+    tempo = features.get('tempo') or 0
+    energy = features.get('energy') or 0
+    return (
+        "AND tempo_bpm BETWEEN %s AND %s AND energy BETWEEN %s AND %s",
+        [tempo - tempo_window, tempo + tempo_window, energy - energy_window, energy + energy_window]
+    )
+
+def _find_similar_tracks_sql(conn, features, liked_track_ids, max_results, prefilter_clause="", prefilter_params=()):
+    """Full-precision SQL variant of find_most_similar_track_in_db()"""
     # Calculate similarity using weighted Euclidean distance
-    # Weights are adjusted based on feature importance for similarity
+    # Weights are adjusted based on feature importance for similarity (SIMILARITY_FEATURES).
+    # Ranking uses the expanded form: the row term is the precomputed sum_w_x2
+    # column (see db_creation/migrate_audio_features.py) and the query term is
+    # constant, so each row costs one dot product.
+    dot_product = ' + '.join(f"{column} * %s::float8" for column, _, _, _ in SIMILARITY_FEATURES)
     similarity_sql = f"""
     SELECT 
         spotify_track_id,
@@ -869,125 +1411,380 @@ def find_most_similar_track_in_db(conn, features, liked_track_ids, max_results=1
         spotify_uri,
         popularity,
         youtube_match,
-        -- Calculate weighted Euclidean distance
-        SQRT(
-            POW((tempo_bpm - %s) / 200.0, 2) * 0.8 +           -- Tempo (normalized by 200 bpm, weight 0.8)
-            POW(beat_regularity - %s, 2) * 1.2 +                -- Beat regularity (weight 1.2)
-            POW((brightness_hz - %s) / 5000.0, 2) * 1.0 +       -- Brightness (normalized, weight 1.0)
-            POW((treble_hz - %s) / 10000.0, 2) * 0.7 +          -- Treble (normalized, weight 0.7)
-            POW((fullness_hz - %s) / 5000.0, 2) * 0.6 +         -- Fullness (normalized, weight 0.6)
-            POW((dynamic_range - %s) / 40.0, 2) * 0.9 +         -- Dynamic range (normalized, weight 0.9)
-            POW(percussiveness - %s, 2) * 0.8 +                 -- Percussiveness (weight 0.8)
-            POW(loudness - %s, 2) * 0.7 +                       -- Loudness (weight 0.7)
-            POW(warmth - %s, 2) * 1.0 +                         -- Warmth/harmonic (weight 1.0)
-            POW(punch - %s, 2) * 0.8 +                          -- Punch/percussive (weight 0.8)
-            POW(texture - %s, 2) * 0.9 +                        -- Texture/MFCC (weight 0.9)
-            POW(energy - %s, 2) * 1.5 +                         -- Energy (weight 1.5 - very important)
-            POW(danceability - %s, 2) * 1.3 +                   -- Danceability (weight 1.3 - important)
-            POW(mood_positive - %s, 2) * 1.2 +                  -- Valence/mood (weight 1.2 - important)
-            POW(acousticness - %s, 2) * 1.0 +                   -- Acousticness (weight 1.0)
-            POW(instrumental - %s, 2) * 0.8                     -- Instrumentalness (weight 0.8)
-        ) AS similarity_distance
+        sum_w_x2 - 2.0 * ({dot_product}) AS rank_key
     FROM audio_features
     WHERE spotify_track_id IS NOT NULL
-    {exclusion_clause}
-    ORDER BY similarity_distance ASC
+    {prefilter_clause}
+    AND NOT (spotify_track_id = ANY(%s::text[]))
+    ORDER BY rank_key ASC
     LIMIT %s
     """
     
-    try:
-        with conn.cursor() as cursor:
-            params = [
-                features.get('tempo', 0),
-                features.get('beat_strength', 0),
-                features.get('spectral_centroid', 0),
-                features.get('spectral_rolloff', 0),
-                features.get('spectral_bandwidth', 0),
-                features.get('spectral_contrast', 0),
-                features.get('zero_crossing_rate', 0),
-                features.get('rms_energy', 0),
-                features.get('harmonic_mean', 0),
-                features.get('percussive_mean', 0),
-                features.get('mfcc_mean', 0),
-                features.get('energy', 0),
-                features.get('danceability', 0),
-                features.get('valence', 0),
-                features.get('acousticness', 0),
-                features.get('instrumentalness', 0)
-            ]
-            
-            # Add liked track IDs to params if they exist
-            if liked_track_ids:
-                params.extend(liked_track_ids)
-            
-            # Add limit
-            params.append(max_results)
-            
-            cursor.execute(similarity_sql, params)
-            results = cursor.fetchall()
-            
-            similar_tracks = []
-            for result in results:
-                similar_tracks.append({
-                    'id': result[0],
-                    'artist_name': result[1],
-                    'track_name': result[2],
-                    'uri': result[3],
-                    'popularity': result[4],
-                    'youtube_match': result[5],
-                    'similarity_distance': result[6]
-                })
-            
-            return similar_tracks
-            
-    except Exception as e:
-        print(f"[ERROR] Failed to find similar tracks: {e}")
-        return []
+    with conn.cursor() as cursor:
+        # Per-dimension query coefficients w*q/s^2 and the constant sum w*(q/s)^2
+        params = []
+        query_term = 0.0
+        for _, key, scale, weight in SIMILARITY_FEATURES:
+            value = features.get(key) or 0
+            params.append(weight * value / (scale * scale))
+            query_term += weight * (value / scale) ** 2
+        
+        params.extend(prefilter_params)
+        
+        # Liked track IDs go in as one text[] parameter (empty array excludes nothing)
+        params.append(list(liked_track_ids or []))
+        
+        # Add limit
+        params.append(max_results)
+        
+        statement_name = f"similarity_sql_{'window' if prefilter_clause else 'all'}"
+        execute_prepared(cursor, statement_name, _numbered_placeholders(similarity_sql), params)
+        results = cursor.fetchall()
+        
+        similar_tracks = []
+        for result in results:
+            rank_key = result[6]
+            similar_tracks.append({
+                'id': result[0],
+                'artist_name': result[1],
+                'track_name': result[2],
+                'uri': result[3],
+                'popularity': result[4],
+                'youtube_match': result[5],
+                'similarity_distance': None if rank_key is None else max(rank_key + query_term, 0.0) ** 0.5
+            })
+        
+        return similar_tracks
 
-# ==== HELPER FUNCTIONS ====
-def get_lastfm_track_genres(artist_name, track_name):
-    """
-    Get genre tags for a track from Last.fm
-    Returns list of genre strings (lowercase)
+# Whole-catalogue feature matrix kept in memory so each seed is ranked with one
+# vectorised pass instead of a database scan. Columns are pre-multiplied by
+# sqrt(weight) / scale, so plain squared Euclidean distance equals the SQL
+# weighted distance. The matrix is float64 (8 bytes per feature, about 128 MB
+# per million tracks): the distance expansion cancels badly in float32, see
+# _find_similar_tracks_in_memory(). Reloaded after FEATURE_MATRIX_TTL seconds, or sooner via
+# invalidate_feature_matrix() when the catalogue is edited; tracks inserted by
+# this process are appended straight away.
+FEATURE_MATRIX_TTL = int(os.environ.get("FEATURE_MATRIX_TTL", "600"))  # seconds
+FEATURE_MATRIX_FETCH_SIZE = 2000  # rows per round trip when streaming the matrix load
+_FEATURE_MATRIX = None  # (loaded_at, track_ids, matrix, row squared norms, metadata rows)
+_FEATURE_MATRIX_LOCK = threading.Lock()
+
+if NUMPY_AVAILABLE:
+    _FEATURE_MATRIX_COLUMN_FACTORS = np.array(
+        [weight ** 0.5 / scale for _, _, scale, weight in SIMILARITY_FEATURES], dtype=np.float64
+    )
+
+def invalidate_feature_matrix():
+    """Drop the in-memory feature matrix so the next similarity search reloads it"""
+    global _FEATURE_MATRIX
+    with _FEATURE_MATRIX_LOCK:
+        _FEATURE_MATRIX = None
+
+def load_feature_matrix(conn):
     """
-    if not LASTFM_API_KEY:
-        return []
+    Return the cached feature matrix, loading it with one bulk SELECT when missing or stale
     
-    try:
-        url = "http://ws.audioscrobbler.com/2.0/"
-        params = {
-            "method": "track.getInfo",
-            "artist": artist_name,
-            "track": track_name,
-            "api_key": LASTFM_API_KEY,
-            "format": "json"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if "track" in data and "toptags" in data["track"] and "tag" in data["track"]["toptags"]:
-            tags = data["track"]["toptags"]["tag"]
-            # Extract tag names and normalize to lowercase
-            genres = [tag["name"].lower() for tag in tags if "name" in tag]
-            return genres[:10]  # Return top 10 tags
+    Args:
+        conn: Database connection (only used on a reload)
+    
+    Returns:
+        tuple: (loaded_at, list of track IDs, float64 matrix (N, features),
+                float64 squared row norms (N,), list of metadata rows)
+    """
+    global _FEATURE_MATRIX
+    with _FEATURE_MATRIX_LOCK:
+        if _FEATURE_MATRIX is not None and time.time() - _FEATURE_MATRIX[0] < FEATURE_MATRIX_TTL:
+            return _FEATURE_MATRIX
+        
+        raw_columns = ', '.join(f"COALESCE({column}, 0)" for column, _, _, _ in SIMILARITY_FEATURES)
+        dims = len(SIMILARITY_FEATURES)
+        chunks = []
+        metadata = []
+        # Named (server-side) cursor: rows are streamed in FEATURE_MATRIX_FETCH_SIZE
+        # batches and packed into arrays as they arrive, instead of holding the
+        # whole catalogue as Python tuples
+        with conn.cursor(name='feature_matrix_scan') as cursor:
+            cursor.itersize = FEATURE_MATRIX_FETCH_SIZE
+            cursor.execute(f"""
+                SELECT spotify_track_id, artist_name, track_name, spotify_uri, popularity, youtube_match,
+                       {raw_columns}
+                FROM audio_features
+                WHERE spotify_track_id IS NOT NULL
+            """)
+            while True:
+                rows = cursor.fetchmany(FEATURE_MATRIX_FETCH_SIZE)
+                if not rows:
+                    break
+                chunks.append(np.array([row[6:] for row in rows], dtype=np.float64))
+                metadata.extend(row[:6] for row in rows)
         
-        return []
+        matrix = np.vstack(chunks) if chunks else np.empty((0, dims), dtype=np.float64)
+        matrix *= _FEATURE_MATRIX_COLUMN_FACTORS
+        track_ids = [row[0] for row in metadata]
         
-    except Exception as e:
-        print(f"[WARN] Could not fetch Last.fm genres: {e}")
-        return []
+        _FEATURE_MATRIX = (time.time(), track_ids, matrix, np.einsum('ij,ij->i', matrix, matrix), metadata)
+        print(f"[INFO] Loaded feature matrix for {len(track_ids)} tracks")
+        return _FEATURE_MATRIX
 
-def compare_genres(seed_genres, candidate_genres):
-    """
-    Compare two genre lists and return True if they share at least one genre
-    Returns: (bool: has_match, list: shared_genres)
+def _scaled_feature_vector(features):
+    """Seed/track features as a float64 vector in the in-memory matrix's column scaling"""
+    values = np.array([features.get(key) or 0 for _, key, _, _ in SIMILARITY_FEATURES], dtype=np.float64)
+    return values * _FEATURE_MATRIX_COLUMN_FACTORS
+
+def append_to_feature_matrix(rows):
     """
-    if not seed_genres or not candidate_genres:
-        # If either track has no genre data, we can't validate - skip this check
-        return (None, [])
+    Add freshly inserted tracks to the loaded feature matrix (no-op if it isn't loaded)
     
-    # Convert to sets for efficient comparison
+    Args:
+        rows: List of (metadata row, features dict); metadata rows are
+              (spotify_track_id, artist_name, track_name, spotify_uri, popularity, youtube_match)
+    """
+    global _FEATURE_MATRIX
+    if not NUMPY_AVAILABLE or not rows:
+        return
+    with _FEATURE_MATRIX_LOCK:
+        if _FEATURE_MATRIX is None:
+            return
+        loaded_at, track_ids, matrix, row_norms, metadata = _FEATURE_MATRIX
+        new_rows = np.vstack([_scaled_feature_vector(features) for _, features in rows])
+        # Build new arrays and swap the tuple, so concurrent searches keep a consistent snapshot
+        _FEATURE_MATRIX = (
+            loaded_at,
+            track_ids + [row[0] for row, _ in rows],
+            np.vstack([matrix, new_rows]),
+            np.concatenate([row_norms, np.einsum('ij,ij->i', new_rows, new_rows)]),
+            metadata + [row for row, _ in rows],
+        )
+
+def _find_similar_tracks_in_memory(conn, features, liked_track_ids, max_results):
+    """Rank the whole catalogue against the seed using the in-memory feature matrix"""
+    _, track_ids, matrix, row_norms, metadata = load_feature_matrix(conn)
+    if not track_ids:
+        return []
+    
+    if not isinstance(liked_track_ids, (set, frozenset)):
+        liked_track_ids = set(liked_track_ids or ())
+    
+    # |x - q|^2 = |x|^2 - 2 x.q + |q|^2: one matrix-vector product, no (N, features) temporary.
+    # The texture (MFCC) column dominates the norms, so this must stay in float64:
+    # in float32 the cancellation swamps the small distances of the closest matches.
+    query = _scaled_feature_vector(features)
+    distances = row_norms - 2.0 * (matrix @ query) + float(query @ query)
+    np.maximum(distances, 0.0, out=distances)
+    
+    # Enough nearest rows that max_results survive even if every excluded track is among them
+    k = min(max_results + len(liked_track_ids), len(track_ids))
+    nearest = np.argpartition(distances, k - 1)[:k]
+    nearest = nearest[np.argsort(distances[nearest])]
+    
+    similar_tracks = []
+    for i in nearest:
+        if track_ids[i] in liked_track_ids:
+            continue
+        row = metadata[i]
+        similar_tracks.append({
+            'id': row[0],
+            'artist_name': row[1],
+            'track_name': row[2],
+            'uri': row[3],
+            'popularity': row[4],
+            'youtube_match': row[5],
+            'similarity_distance': float(distances[i]) ** 0.5
+        })
+        if len(similar_tracks) >= max_results:
+            break
+    
+    return similar_tracks
+
+def find_most_similar_track_in_db(conn, features, liked_track_ids, max_results=10):
+    """
+    Find the most mathematically similar tracks in the database
+    Uses Euclidean distance across all audio feature columns
+    Excludes tracks the user has already liked
+    Returns multiple results so we can validate them
+    
+    With NumPy available the whole catalogue is ranked against the cached
+    in-memory feature matrix. Without it (or if that fails) the SQL scan is
+    used: a tempo/energy window around the seed (index range scan) is widened
+    until it holds max_results tracks, then the search is rerun over the window
+    implied by the worst of those distances. Both paths return exactly the
+    tracks a full scan would.
+    """
+    if not features:
+        return []
+    
+    if NUMPY_AVAILABLE:
+        try:
+            return _find_similar_tracks_in_memory(conn, features, liked_track_ids, max_results)
+        except Exception as e:
+            print(f"[WARN] In-memory similarity search failed: {e} - falling back to database scan")
+            conn.rollback()
+    
+    similar_tracks = []
+    
+    for window in SIMILARITY_PREFILTER_WINDOWS:
+        prefilter_clause, prefilter_params = _similarity_prefilter(features, window)
+        
+        try:
+            similar_tracks = _find_similar_tracks_sql(conn, features, liked_track_ids, max_results, prefilter_clause, prefilter_params)
+        except Exception as e:
+            print(f"[ERROR] Failed to find similar tracks: {e}")
+            conn.rollback()
+            return []
+        
+        if window is None:
+            return similar_tracks
+        
+        if len(similar_tracks) >= max_results:
+            break
+        
+        print(f"[INFO] Only {len(similar_tracks)} tracks within ±{window[0]:.0f} bpm / ±{window[1]} energy, widening search...")
+    
+    # Anything closer than the current k-th best must lie inside this window
+    worst_distance = similar_tracks[-1]['similarity_distance'] if similar_tracks else None
+    if worst_distance is None:
+        return similar_tracks
+    exact_window = _exact_prefilter_window(worst_distance)
+    if exact_window[0] <= window[0] and exact_window[1] <= window[1]:
+        return similar_tracks
+    
+    prefilter_clause, prefilter_params = _similarity_prefilter(features, exact_window)
+    try:
+        return _find_similar_tracks_sql(conn, features, liked_track_ids, max_results, prefilter_clause, prefilter_params)
+    except Exception as e:
+        print(f"[ERROR] Failed to find similar tracks: {e}")
+        conn.rollback()
+        return similar_tracks
+
+# ==== HELPER FUNCTIONS ====
+@functools.lru_cache(maxsize=4096)
+def _fetch_lastfm_track_genres(artist_name, track_name):
+    """
+    Cached Last.fm track.getInfo lookup
+    Raises on network, HTTP and Last.fm API errors so only real answers are cached
+    """
+    url = "http://ws.audioscrobbler.com/2.0/"
+    params = {
+        "method": "track.getInfo",
+        "artist": artist_name,
+        "track": track_name,
+        "api_key": LASTFM_API_KEY,
+        "format": "json"
+    }
+    
+    lastfm_throttle()
+    response = _LASTFM_SESSION.get(url, params=params, timeout=10)
+    data = parse_lastfm_response(response)
+    
+    if "track" in data and "toptags" in data["track"] and "tag" in data["track"]["toptags"]:
+        tags = data["track"]["toptags"]["tag"]
+        # Extract tag names and normalize to lowercase
+        genres = [tag["name"].lower() for tag in tags if "name" in tag]
+        return tuple(genres[:10])  # Return top 10 tags
+    
+    return ()
+
+def get_lastfm_track_genres(artist_name, track_name):
+    """
+    Get genre tags for a track from Last.fm
+    Returns tuple of genre strings (lowercase)
+    
+    Successful lookups are cached for the life of the process, so repeated
+    seeds don't hit the network again.
+    """
+    if not LASTFM_API_KEY:
+        return ()
+    
+    try:
+        # Last.fm matching is case-insensitive, so fold case to share cache entries
+        return _fetch_lastfm_track_genres(artist_name.lower(), track_name.lower())
+    except Exception as e:
+        print(f"[WARN] Could not fetch Last.fm genres: {e}")
+        return ()
+
+# Artist searches, top tracks and track/artist objects are public catalogue data, so one
+# process-wide cache is shared by every user's runs
+SPOTIFY_LOOKUP_CACHE_TTL = 24 * 60 * 60  # seconds
+SPOTIFY_LOOKUP_CACHE_MAX_ENTRIES = 2048
+_SPOTIFY_LOOKUP_CACHE = {}
+_SPOTIFY_LOOKUP_CACHE_LOCK = threading.Lock()
+
+def _cached_spotify_lookup(key, fetch):
+    """
+    Return a cached Spotify response for key, calling fetch() on a miss
+    
+    Only non-empty responses are cached, so failures are retried next time.
+    """
+    now = time.time()
+    with _SPOTIFY_LOOKUP_CACHE_LOCK:
+        entry = _SPOTIFY_LOOKUP_CACHE.get(key)
+        if entry and now - entry[0] < SPOTIFY_LOOKUP_CACHE_TTL:
+            return entry[1]
+    
+    result = fetch()
+    if result:
+        _store_spotify_lookup(key, result, now)
+    return result
+
+def _store_spotify_lookup(key, result, now=None):
+    """Put a response in the lookup cache, evicting the oldest entry when full"""
+    with _SPOTIFY_LOOKUP_CACHE_LOCK:
+        _SPOTIFY_LOOKUP_CACHE.pop(key, None)
+        if len(_SPOTIFY_LOOKUP_CACHE) >= SPOTIFY_LOOKUP_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order - drop the oldest entry
+            _SPOTIFY_LOOKUP_CACHE.pop(next(iter(_SPOTIFY_LOOKUP_CACHE)))
+        _SPOTIFY_LOOKUP_CACHE[key] = (now or time.time(), result)
+
+def search_artist_cached(sp, query):
+    """sp.search(query, type="artist", limit=1), cached by query string"""
+    return _cached_spotify_lookup(
+        ("search_artist", query),
+        lambda: safe_spotify_call(sp.search, query, type="artist", limit=1)
+    )
+
+def artist_top_tracks_cached(sp, artist_id, country="US"):
+    """sp.artist_top_tracks(artist_id), cached by artist ID and country"""
+    return _cached_spotify_lookup(
+        ("top_tracks", artist_id, country),
+        lambda: safe_spotify_call(sp.artist_top_tracks, artist_id, country=country)
+    )
+
+def track_cached(sp, track_id):
+    """sp.track(track_id), cached by track ID"""
+    return _cached_spotify_lookup(("track", track_id), lambda: safe_spotify_call(sp.track, track_id))
+
+def prefetch_tracks_cached(sp, track_ids):
+    """
+    Warm the track_cached() cache for many IDs with batched sp.tracks() calls
+    
+    Candidate loops can then keep calling track_cached() one ID at a time
+    without a request per candidate.
+    """
+    now = time.time()
+    with _SPOTIFY_LOOKUP_CACHE_LOCK:
+        missing = [
+            tid for tid in dict.fromkeys(track_ids)
+            if not (("track", tid) in _SPOTIFY_LOOKUP_CACHE
+                    and now - _SPOTIFY_LOOKUP_CACHE[("track", tid)][0] < SPOTIFY_LOOKUP_CACHE_TTL)
+        ]
+    for track in fetch_full_tracks(sp, missing):
+        if track.get("id"):
+            _store_spotify_lookup(("track", track["id"]), track, now)
+
+def artist_cached(sp, artist_id):
+    """sp.artist(artist_id), cached by artist ID (follower counts may lag by up to the TTL)"""
+    return _cached_spotify_lookup(("artist", artist_id), lambda: safe_spotify_call(sp.artist, artist_id))
+
+def compare_genres(seed_genres, candidate_genres):
+    """
+    Compare two genre lists and return True if they share at least one genre
+    Returns: (bool: has_match, list: shared_genres)
+    """
+    if not seed_genres or not candidate_genres:
+        # If either track has no genre data, we can't validate - skip this check
+        return (None, [])
+    
+    # Convert to sets for efficient comparison
     seed_set = set(seed_genres)
     candidate_set = set(candidate_genres)
     
@@ -996,35 +1793,71 @@ def compare_genres(seed_genres, candidate_genres):
     
     return (len(shared) > 0, list(shared))
 
+# 429s are handled here rather than in the HTTP adapter: every thread holds off
+# until the (capped) Retry-After window has passed instead of piling on, then
+# the rate-limited call is retried
+SPOTIFY_RATE_LIMIT_COOLDOWN = 5  # seconds, used when the Retry-After header can't be parsed
+SPOTIFY_MAX_COOLDOWN = 60  # seconds - longer bans fail fast rather than stall every run
+SPOTIFY_RATE_LIMIT_RETRIES = 3
+_SPOTIFY_COOLDOWN_UNTIL = 0.0
+_SPOTIFY_COOLDOWN_LOCK = threading.Lock()
+
+def _wait_for_spotify_cooldown():
+    """Sleep until the shared rate-limit cooldown (plus a little jitter) has passed"""
+    delay = _SPOTIFY_COOLDOWN_UNTIL - time.monotonic()
+    if delay > 0:
+        time.sleep(delay + random.uniform(0, 0.5))
+
+def _start_spotify_cooldown(e):
+    """Start (or extend) the shared cooldown from a 429 SpotifyException"""
+    global _SPOTIFY_COOLDOWN_UNTIL
+    try:
+        retry_after = float((getattr(e, 'headers', None) or {}).get('Retry-After', SPOTIFY_RATE_LIMIT_COOLDOWN))
+    except (TypeError, ValueError):
+        retry_after = SPOTIFY_RATE_LIMIT_COOLDOWN
+    retry_after = min(retry_after, SPOTIFY_MAX_COOLDOWN)
+    with _SPOTIFY_COOLDOWN_LOCK:
+        _SPOTIFY_COOLDOWN_UNTIL = max(_SPOTIFY_COOLDOWN_UNTIL, time.monotonic() + retry_after)
+
+def _is_spotify_rate_limit(e):
+    """
+    True for a genuine 429 from Spotify, which always carries Retry-After.
+    spotipy also raises http_status=429 ("Max Retries", no headers) when the
+    HTTP adapter's retries run out, whatever the underlying error was - that
+    must not pause every other thread.
+    """
+    if e.http_status != 429 or "Max Retries" in str(e.msg):
+        return False
+    return 'Retry-After' in (getattr(e, 'headers', None) or {})
+
 def safe_spotify_call(func, *args, **kwargs):
-    """Spotify call wrapper with retries, 404 skip, and None fallback. Includes rate limiting."""
-    # Add small delay to avoid rate limiting (Spotify allows ~100 req/min, so 0.6s = safe)
-    time.sleep(0.1)
+    """
+    Spotify call wrapper with 404 skip and None fallback
     
-    retries = 3
-    for attempt in range(retries):
+    5xx retries happen in the HTTP adapter of the client's session. A real
+    429 (one with a Retry-After header) starts a shared cooldown (Retry-After, capped at SPOTIFY_MAX_COOLDOWN)
+    that all calls wait out, and the call is retried up to
+    SPOTIFY_RATE_LIMIT_RETRIES times.
+    """
+    name = getattr(func, '__name__', str(func))
+    for attempt in range(SPOTIFY_RATE_LIMIT_RETRIES + 1):
+        _wait_for_spotify_cooldown()
         try:
             return func(*args, **kwargs)
         except SpotifyException as e:
-            if e.http_status == 404:
-                print(f"[404] {getattr(func,'__name__',str(func))} returned 404 - skipping")
-                return None
-            elif e.http_status == 429:
-                wait_time = 2 ** attempt
-                print(f"[429] Rate limited. Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
+            if _is_spotify_rate_limit(e):
+                _start_spotify_cooldown(e)
+                if attempt < SPOTIFY_RATE_LIMIT_RETRIES:
+                    print(f"[429] {name} rate limited - pausing Spotify calls and retrying ({attempt + 1}/{SPOTIFY_RATE_LIMIT_RETRIES})")
+                    continue
+                print(f"[429] {name} still rate limited after {SPOTIFY_RATE_LIMIT_RETRIES} retries - skipping")
+            elif e.http_status == 404:
+                print(f"[404] {name} returned 404 - skipping")
             else:
-                print(f"[ERROR] {getattr(func,'__name__',str(func))}: {e}")
-                if attempt == retries - 1:
-                    break
-                time.sleep(2 ** attempt)
+                print(f"[ERROR] {name}: {e}")
         except Exception as e:
-            print(f"[ERROR] {getattr(func,'__name__',str(func))}: {e}")
-            if attempt == retries - 1:
-                break
-            time.sleep(2 ** attempt)
-    print(f"[FAIL] {getattr(func,'__name__',str(func))} failed after {retries} retries")
-    return None
+            print(f"[ERROR] {name}: {e}")
+        return None
 
 def validate_track_lite(track, existing_artist_ids=None, liked_songs_artist_ids=None, max_follower_count=None):
     """
@@ -1041,25 +1874,110 @@ def validate_track_lite(track, existing_artist_ids=None, liked_songs_artist_ids=
     aid = artist.get("id")
     artist_name = artist.get("name", "Unknown")
 
-    # 1. Check follower count if limit is set
-    if max_follower_count is not None:
-        follower_count = artist.get("followers", {}).get("total", 0)
-        if follower_count > max_follower_count:
-            print(f"[SKIP] Artist '{artist_name}' has {follower_count:,} followers (limit: {max_follower_count:,})")
-            return False
+    # Cheapest checks first: set lookups (callers pass sets/frozensets)
+    # 1. Already in target playlist
+    if existing_artist_ids and (aid in existing_artist_ids):
+        return False
 
     # 2. Check if artist appears in user's liked songs
     if liked_songs_artist_ids and aid in liked_songs_artist_ids:
         print(f"[SKIP] Artist '{artist_name}' appears in liked songs - skipping")
         return False
 
-    # 3. Already in target playlist
-    if existing_artist_ids and (aid in existing_artist_ids):
-        return False
+    # 3. Check follower count if limit is set
+    if max_follower_count is not None:
+        followers = artist.get("followers")
+        follower_count = followers.get("total", 0) if followers else 0
+        if follower_count > max_follower_count:
+            print(f"[SKIP] Artist '{artist_name}' has {follower_count:,} followers (limit: {max_follower_count:,})")
+            return False
 
     return True
 
-def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_ids, liked_songs_artist_ids=None, liked_track_ids=None, max_follower_count=None, genre_pool=None):
+# Number of similarity candidates validated in parallel
+SIMILAR_CANDIDATE_WORKERS = 5
+
+def _validate_similar_candidate(sp, idx, similar_track_info, existing_artist_ids, liked_songs_artist_ids, max_follower_count, genre_pool, rejected_artist_ids, artist_genres_cache):
+    """
+    Validate one candidate from find_most_similar_track_in_db()
+    Runs in a worker thread from get_similar_tracks_by_audio_features_db()
+    
+    Checks run cheapest first: the artist rejection set, then validate_track_lite
+    (no network), and only then the genre lookup. Every check here depends only
+    on the artist, so a failure rejects the artist for the remaining candidates.
+    
+    Args:
+        rejected_artist_ids: Set of artist IDs that already failed for this seed (shared between workers)
+        artist_genres_cache: Dict of artist ID -> genres fetched for this seed (shared between workers)
+    
+    Returns:
+        Full track object if the candidate passes validation, None otherwise
+    """
+    try:
+        print(f"[INFO] Candidate {idx}: '{similar_track_info['track_name']}' by {similar_track_info['artist_name']} (distance: {similar_track_info['similarity_distance']:.4f})")
+        
+        # Get full track info from Spotify
+        similar_track = track_cached(sp, similar_track_info['id'])
+        
+        if not similar_track:
+            print(f"[SKIP] Candidate {idx}: Could not get track info from Spotify")
+            return None
+        
+        candidate_artist_id = similar_track['artists'][0].get('id')
+        if candidate_artist_id in rejected_artist_ids:
+            print(f"[SKIP] Candidate {idx}: Artist already rejected for this seed")
+            return None
+        
+        # REQUIREMENT 1: Validate the track (follower count, not in liked songs, etc.)
+        if not validate_track_lite(similar_track, existing_artist_ids, liked_songs_artist_ids, max_follower_count):
+            print(f"[SKIP] Candidate {idx}: Track did not pass validation requirements")
+            rejected_artist_ids.add(candidate_artist_id)
+            return None
+        
+        # GENRE VALIDATION: Use genre pool to check if candidate artist matches
+        if genre_pool:
+            candidate_artist_name = similar_track['artists'][0]['name']
+            
+            # Get candidate artist genres from database (fast lookup, no API calls)
+            if candidate_artist_id in artist_genres_cache:
+                candidate_genres = artist_genres_cache[candidate_artist_id]
+            else:
+                candidate_genres = get_artist_genres_live(sp, candidate_artist_name)
+                artist_genres_cache[candidate_artist_id] = candidate_genres
+            
+            if candidate_genres:
+                print(f"[INFO] Candidate {idx} genres: {', '.join(candidate_genres[:5])}")
+                # Check if candidate has at least 1 genre matching the pool
+                has_match, matched = check_genre_match(
+                    genre_pool, 
+                    candidate_genres, 
+                    min_matches=1,
+                    max_common_genres=1,
+                    strict_mode=False  # Use loose mode for similarity matching
+                )
+                
+                if has_match:
+                    print(f"[SUCCESS] ✓ Candidate {idx} genre match found: {', '.join(matched[:3])}")
+                else:
+                    print(f"[SKIP] Candidate {idx}: No genre overlap with source pool")
+                    rejected_artist_ids.add(candidate_artist_id)
+                    return None
+            else:
+                print(f"[WARN] Candidate {idx}: No genre data - accepting anyway (can't validate)")
+        
+        return similar_track
+    except Exception as e:
+        print(f"[ERROR] Candidate {idx} validation failed: {e}")
+        return None
+
+def _seed_cancelled(cancel_event, stage):
+    """True (and logged) if another seed already produced a track, so this one should stop before stage"""
+    if cancel_event is not None and cancel_event.is_set():
+        print(f"[INFO] Seed search stopped before {stage} - another seed already found a track")
+        return True
+    return False
+
+def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_ids, liked_songs_artist_ids=None, liked_track_ids=None, max_follower_count=None, genre_pool=None, cancel_event=None):
     """
     Find similar tracks using the audio features database and YouTube/librosa analysis
     
@@ -1075,9 +1993,11 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
         seed_track_id: The track ID to use as seed for similarity matching
         existing_artist_ids: Set of artist IDs already in the playlist
         liked_songs_artist_ids: Set of artist IDs from user's liked songs (to exclude)
-        liked_track_ids: List of track IDs the user has liked (to exclude from results)
+        liked_track_ids: Set of track IDs the user has liked (to exclude from results)
         max_follower_count: Maximum artist follower count (None = no limit)
         genre_pool: Optional list of genres to validate against (instead of Last.fm calls)
+        cancel_event: Optional threading.Event set once another seed has won;
+                      checked between stages so this seed stops early
     
     Returns:
         Track object if found, None otherwise
@@ -1090,7 +2010,7 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
         print(f"[INFO] [DB-SIMILARITY] Analyzing seed track {seed_track_id[:10]}... with YouTube + librosa")
         
         # Get seed track info from Spotify
-        seed_track = safe_spotify_call(sp.track, seed_track_id)
+        seed_track = track_cached(sp, seed_track_id)
         if not seed_track:
             print("[SKIP] Could not get seed track info")
             return None
@@ -1100,6 +2020,9 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
         
         print(f"[INFO] Seed track: '{track_name}' by {artist_name}")
         
+        if _seed_cancelled(cancel_event, "database lookup"):
+            return None
+        
         # Connect to database
         conn = get_db_connection()
         if not conn:
@@ -1108,16 +2031,14 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
         
         try:
             # Check if seed track already in database (REQUIREMENT 2: skip YouTube if exists)
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT spotify_track_id FROM audio_features WHERE spotify_track_id = %s",
-                    (seed_track_id,)
-                )
-                already_exists = cursor.fetchone() is not None
+            features_from_db = fetch_track_features_from_db(conn, seed_track_id)
             
-            if already_exists:
+            if features_from_db:
                 print(f"[INFO] ✓ Seed track already in database, skipping YouTube analysis")
             else:
+                if _seed_cancelled(cancel_event, "YouTube analysis"):
+                    return None
+                
                 # Search YouTube for the track
                 print(f"[INFO] Searching YouTube for: {artist_name} - {track_name}")
                 try:
@@ -1127,7 +2048,7 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
                         return None
                     
                     print(f"[INFO] Downloading and analyzing YouTube audio for video: {youtube_title} ({video_id})")
-                    features = download_and_analyze_audio(video_id, track_name, artist_name)
+                    features = analyze_audio_in_worker(video_id, track_name, artist_name)
                     if not features:
                         print(f"[ERROR] Audio analysis failed for YouTube video '{youtube_title}'. Skipping seed.")
                         return None
@@ -1139,40 +2060,15 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
                 except Exception as e:
                     print(f"[ERROR] Exception during YouTube download/analyze: {e}. Skipping seed.")
                     return None
+                
+                # The freshly extracted features are what was just stored - no need to read them back
+                features_from_db = features
+            
+            if _seed_cancelled(cancel_event, "similarity search"):
+                return None
             
             # Now query database for most similar track
             print(f"[INFO] Searching database for most similar track...")
-            # Re-fetch features from database to ensure we have the exact same values
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT tempo_bpm, key_musical, beat_regularity, brightness_hz, treble_hz, fullness_hz, dynamic_range, percussiveness, loudness, warmth, punch, texture, energy, danceability, mood_positive, acousticness, instrumental FROM audio_features WHERE spotify_track_id = %s",
-                    (seed_track_id,)
-                )
-                row = cursor.fetchone()
-                if not row:
-                    print(f"[ERROR] Could not fetch features for seed track from DB. Skipping seed.")
-                    return None
-                
-                features_from_db = {
-                    'tempo': row[0],
-                    'key_estimate': row[1],
-                    'beat_strength': row[2],
-                    'spectral_centroid': row[3],
-                    'spectral_rolloff': row[4],
-                    'spectral_bandwidth': row[5],
-                    'spectral_contrast': row[6],
-                    'zero_crossing_rate': row[7],
-                    'rms_energy': row[8],
-                    'harmonic_mean': row[9],
-                    'percussive_mean': row[10],
-                    'mfcc_mean': row[11],
-                    'energy': row[12],
-                    'danceability': row[13],
-                    'valence': row[14],
-                    'acousticness': row[15],
-                    'instrumentalness': row[16]
-                }
-            
             print(f"[DEBUG] Seed track features for comparison: {features_from_db}")
             
             # Find most similar tracks (get top 10 to validate)
@@ -1190,60 +2086,45 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
             else:
                 print(f"[INFO] No genre pool provided - skipping genre validation")
             
-            # Try each similar track until we find one that passes validation
-            for idx, similar_track_info in enumerate(similar_tracks_list, 1):
-                print(f"[INFO] Candidate {idx}: '{similar_track_info['track_name']}' by {similar_track_info['artist_name']} (distance: {similar_track_info['similarity_distance']:.4f})")
-                
-                # Get full track info from Spotify
-                similar_track = safe_spotify_call(sp.track, similar_track_info['id'])
-                
-                if not similar_track:
-                    print(f"[SKIP] Could not get track info from Spotify")
-                    continue
-                
-                # REQUIREMENT 1: Validate the track (follower count, not in liked songs, etc.)
-                if not validate_track_lite(similar_track, existing_artist_ids, liked_songs_artist_ids, max_follower_count):
-                    print(f"[SKIP] Track did not pass validation requirements")
-                    continue
-                
-                # GENRE VALIDATION: Use genre pool to check if candidate artist matches
-                if use_genre_validation:
-                    print(f"[INFO] Checking genre compatibility against pool...")
-                    candidate_artist_name = similar_track['artists'][0]['name']
-                    
-                    # Get candidate artist genres from database (fast lookup, no API calls)
-                    candidate_genres = get_artist_genres_live(sp, candidate_artist_name)
-                    
-                    if candidate_genres:
-                        print(f"[INFO] Candidate genres: {', '.join(candidate_genres[:5])}")
-                        # Check if candidate has at least 1 genre matching the pool
-                        has_match, matched = check_genre_match(
-                            genre_pool, 
-                            candidate_genres, 
-                            min_matches=1,
-                            max_common_genres=1,
-                            strict_mode=False  # Use loose mode for similarity matching
-                        )
-                        
-                        if has_match:
-                            print(f"[SUCCESS] ✓ Genre match found: {', '.join(matched[:3])}")
-                        else:
-                            print(f"[SKIP] No genre overlap with source pool")
-                            continue
-                    else:
-                        print(f"[WARN] No genre data for candidate - accepting anyway (can't validate)")
+            # Validate candidates concurrently (each one is a chain of blocking API calls).
+            # Results are still taken in similarity order so the closest valid track wins.
+            from concurrent.futures import ThreadPoolExecutor
+            
+            # One sp.tracks() call for all candidates instead of one sp.track() per worker
+            prefetch_tracks_cached(sp, [t['id'] for t in similar_tracks_list])
+            
+            rejected_artist_ids = set()
+            artist_genres_cache = {}
+            executor = ThreadPoolExecutor(max_workers=SIMILAR_CANDIDATE_WORKERS)
+            try:
+                futures = [
+                    executor.submit(
+                        _validate_similar_candidate,
+                        sp, idx, similar_track_info, existing_artist_ids, liked_songs_artist_ids,
+                        max_follower_count, genre_pool if use_genre_validation else None,
+                        rejected_artist_ids, artist_genres_cache
+                    )
+                    for idx, similar_track_info in enumerate(similar_tracks_list, 1)
+                ]
                 
-                # Found a valid track!
-                print(f"[SUCCESS] ✓ Found mathematically similar track: {similar_track['name']} by {similar_track['artists'][0]['name']}")
-                print(f"[SUCCESS] ✓ Similarity distance: {similar_track_info['similarity_distance']:.4f}")
-                return similar_track
+                for future, similar_track_info in zip(futures, similar_tracks_list):
+                    if _seed_cancelled(cancel_event, "candidate validation"):
+                        return None
+                    similar_track = future.result()
+                    if similar_track:
+                        # Found a valid track!
+                        print(f"[SUCCESS] ✓ Found mathematically similar track: {similar_track['name']} by {similar_track['artists'][0]['name']}")
+                        print(f"[SUCCESS] ✓ Similarity distance: {similar_track_info['similarity_distance']:.4f}")
+                        return similar_track
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
             
             # If we get here, none of the similar tracks passed validation
             print("[INFO] No similar tracks passed validation requirements")
             return None
             
         finally:
-            conn.close()
+            release_db_connection(conn)
         
     except YouTubeRateLimitError as e:
         print(f"[ERROR] YouTube rate limit hit: {e}")
@@ -1254,56 +2135,153 @@ def get_similar_tracks_by_audio_features_db(sp, seed_track_id, existing_artist_i
         traceback.print_exc()
         return None
 
-def get_random_liked_track_for_artist(sp, artist_id):
+LIKED_SONGS_PAGE_SIZE = 50
+LIKED_SONGS_FETCH_WORKERS = 8
+
+def fetch_all_pages(fetch_page, page_size, max_workers=LIKED_SONGS_FETCH_WORKERS):
     """
-    Get a random liked song from a specific artist
+    Fetch every item of a Spotify paging object
+    
+    The first page is requested on its own to learn 'total'; the remaining
+    offsets are then fetched concurrently and merged in order.
+    
+    Args:
+        fetch_page: Callable taking an offset and returning a Spotify page dict
+        page_size: Items per page (the limit passed to the API)
+        max_workers: Maximum concurrent page requests
+    
+    Returns:
+        tuple: (list of items, total reported by the API)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    first_page = fetch_page(0)
+    if not first_page or not first_page.get("items"):
+        return [], 0
+    
+    items = list(first_page["items"])
+    total = first_page.get("total") or len(items)
+    offsets = list(range(page_size, total, page_size))
+    if not offsets:
+        return items, total
+    
+    def fetch_page_items(offset):
+        try:
+            page = fetch_page(offset)
+            return page.get("items", []) if page else []
+        except Exception as e:
+            print(f"[WARN] Could not fetch page at offset {offset}: {e}")
+            return []
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+        for page_items in executor.map(fetch_page_items, offsets):
+            items.extend(page_items)
+    
+    return items, total
+
+SPOTIFY_TRACKS_BATCH_SIZE = 50  # Max IDs per sp.tracks() call
+
+def fetch_full_tracks(sp, track_ids):
+    """
+    Fetch full track objects for many IDs via sp.tracks(), 50 IDs per request
     
     Args:
         sp: Spotify client
-        artist_id: The artist ID to find tracks for
+        track_ids: Iterable of Spotify track IDs
     
     Returns:
-        Track ID of a random liked song by this artist, or None
+        List of full track dicts in input order (unavailable tracks are skipped)
+    """
+    track_ids = list(track_ids)
+    tracks = []
+    for i in range(0, len(track_ids), SPOTIFY_TRACKS_BATCH_SIZE):
+        result = safe_spotify_call(sp.tracks, track_ids[i:i + SPOTIFY_TRACKS_BATCH_SIZE])
+        if result and result.get("tracks"):
+            tracks.extend(t for t in result["tracks"] if t)
+    return tracks
+
+def fetch_liked_song_items(sp):
+    """
+    Fetch every saved-track item from the user's liked songs
+    
+    Args:
+        sp: Spotify client
+    
+    Returns:
+        list: Saved-track items in library order (empty list on failure)
     """
+    limit = LIKED_SONGS_PAGE_SIZE
+    items, total = fetch_all_pages(
+        lambda offset: safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset),
+        limit
+    )
+    
+    if total > limit:
+        print(f"[INFO] Fetched {len(items)} of {total} liked songs")
+    return items
+
+def fetch_playlist_items(sp, playlist_id, fields=None):
+    """
+    Fetch every item of a playlist (pages after the first are fetched concurrently)
+    
+    Args:
+        sp: Spotify client
+        playlist_id: Playlist to list
+        fields: Optional Spotify fields filter for the items (total is always requested)
+    
+    Returns:
+        list: Playlist items in playlist order
+    """
+    page_fields = f"{fields},total" if fields else None
+    items, _ = fetch_all_pages(
+        lambda offset: safe_spotify_call(sp.playlist_items, playlist_id, offset=offset, limit=100, fields=page_fields),
+        100
+    )
+    return items
+
+def build_liked_songs_index(sp, liked_items=None):
+    """
+    Scan the user's liked songs once and index them by artist
+    
+    Args:
+        sp: Spotify client
+        liked_items: Items from fetch_liked_song_items() (fetched here if not given)
+    
+    Returns:
+        dict: artist_id -> list of liked track IDs (every artist credited on the track)
+    """
+    from collections import defaultdict
+    
+    liked_by_artist = defaultdict(list)
+    
     try:
-        # Scan through liked songs to find tracks by this artist
-        artist_tracks = []
-        offset = 0
-        limit = 50
-        
-        while True:
-            items = safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset)
-            if not items or not items.get("items"):
-                break
-            
-            for item in items["items"]:
-                track = item.get("track")
-                if not track:
-                    continue
-                
-                # Check if any artist matches
-                for artist in track.get("artists", []):
-                    if artist.get("id") == artist_id:
-                        artist_tracks.append(track["id"])
-                        break
-            
-            # If we found some tracks, we can stop early (for performance)
-            if len(artist_tracks) >= 5:
-                break
-            
-            if len(items["items"]) < limit:
-                break
+        if liked_items is None:
+            liked_items = fetch_liked_song_items(sp)
+        for item in liked_items:
+            track = item.get("track")
+            if not track or not track.get("id"):
+                continue
             
-            offset += limit
-        
-        if artist_tracks:
-            return random.choice(artist_tracks)
-        
-        return None
-        
+            for aid in track_artist_ids(track):
+                liked_by_artist[aid].append(track["id"])
     except Exception as e:
-        print(f"[ERROR] Error finding liked tracks for artist: {e}")
-        return None
+        print(f"[WARN] Could not index liked songs: {e}")
+    
+    return dict(liked_by_artist)
+
+def get_random_liked_track_for_artist(liked_by_artist, artist_id):
+    """
+    Get a random liked song from a specific artist
+    
+    Args:
+        liked_by_artist: Index returned by build_liked_songs_index()
+        artist_id: The artist ID to find tracks for
+    
+    Returns:
+        Track ID of a random liked song by this artist, or None
+    """
+    artist_tracks = liked_by_artist.get(artist_id)
+    return random.choice(artist_tracks) if artist_tracks else None
 
 def search_user_playlists_for_artist(sp, artist_id, artist_name, existing_artist_ids, liked_songs_artist_ids=None, max_follower_count=None, max_playlists=5):
     """
@@ -1328,9 +2306,18 @@ def search_user_playlists_for_artist(sp, artist_id, artist_name, existing_artist
         candidate_playlists = []
         seen_playlist_ids = set()
         
-        # Fetch multiple pages to get variety
-        for page_offset in [0, 50, 100, 150]:
-            search_res = safe_spotify_call(sp.search, artist_name, type="playlist", limit=50, offset=page_offset)
+        # Fetch multiple pages to get variety - the pages are independent, so
+        # request them all at once instead of one round trip after another
+        from concurrent.futures import ThreadPoolExecutor
+        
+        page_offsets = [0, 50, 100, 150]
+        with ThreadPoolExecutor(max_workers=len(page_offsets)) as executor:
+            search_pages = list(executor.map(
+                lambda page_offset: safe_spotify_call(sp.search, artist_name, type="playlist", limit=50, offset=page_offset),
+                page_offsets
+            ))
+        
+        for search_res in search_pages:
             if not search_res or "playlists" not in search_res or not search_res["playlists"].get("items"):
                 break
             
@@ -1344,12 +2331,6 @@ def search_user_playlists_for_artist(sp, artist_id, artist_name, existing_artist
                     
                 seen_playlist_ids.add(pid)
                 candidate_playlists.append(pl)
-            
-            time.sleep(0.15)  # Rate limiting courtesy
-            
-            # Stop if we have enough candidates
-            if len(candidate_playlists) >= max_playlists * 3:
-                break
         
         if not candidate_playlists:
             print(f"[INFO] No user playlists found for '{artist_name}'")
@@ -1358,84 +2339,77 @@ def search_user_playlists_for_artist(sp, artist_id, artist_name, existing_artist
         # Shuffle to avoid always checking the same popular playlists
         random.shuffle(candidate_playlists)
         
-        playlists_checked = 0
-        for pl in candidate_playlists:
-            if playlists_checked >= max_playlists:
-                break
-            
-            playlist_id = pl["id"]
-            playlist_name = pl.get("name", "<unknown>")
-            
-            # Fetch playlist items to verify artist is present
-            playlist_data = safe_spotify_call(
+        # Only IDs are needed to count and screen candidates; the one track
+        # that passes validation is upgraded to a full object afterwards
+        def fetch_playlist_data(pl):
+            return safe_spotify_call(
                 sp.playlist_items,
-                playlist_id,
-                fields="items(track(id,name,artists(id,name,followers)))",
+                pl["id"],
+                # Artist names are only used by validate_track_lite()'s skip messages
+                fields="items(track(id,artists(id,name)))",
                 limit=100
             )
-            
-            if not playlist_data or "items" not in playlist_data:
-                print(f"[SKIP] Playlist '{playlist_name}' is empty or inaccessible")
-                continue
-            
-            # Verify the artist is actually in this playlist
-            contains_artist = False
-            for item in playlist_data["items"]:
-                track = item.get("track")
-                if not track:
-                    continue
+        
+        # Playlist items are fetched in waves sized to the number of playlists
+        # still needed, then checked in shuffled order as before
+        playlists_checked = 0
+        next_index = 0
+        with ThreadPoolExecutor(max_workers=max_playlists) as executor:
+            while playlists_checked < max_playlists and next_index < len(candidate_playlists):
+                wave = candidate_playlists[next_index:next_index + max_playlists - playlists_checked]
+                next_index += len(wave)
                 
-                for artist in track.get("artists", []):
-                    if artist.get("id") == artist_id:
-                        contains_artist = True
+                for pl, playlist_data in zip(wave, executor.map(fetch_playlist_data, wave)):
+                    if playlists_checked >= max_playlists:
                         break
-                
-                if contains_artist:
-                    break
-            
-            if not contains_artist:
-                print(f"[SKIP] Playlist '{playlist_name}' doesn't actually contain '{artist_name}'")
-                continue
-            
-            # Count how many tracks by this artist are in the playlist
-            artist_track_count = sum(
-                1 for item in playlist_data["items"]
-                if item.get("track") and any(
-                    a.get("id") == artist_id for a in item["track"].get("artists", [])
-                )
-            )
-            
-            # Skip playlists dominated by this artist (likely artist-focused playlists)
-            if artist_track_count > 10:
-                print(f"[SKIP] Playlist '{playlist_name}' has too many tracks by '{artist_name}' ({artist_track_count})")
-                continue
-            
-            playlists_checked += 1
-            print(f"[INFO] Checking playlist '{playlist_name}' (contains {artist_track_count} tracks by '{artist_name}')...")
-            
-            # Try up to 10 times to find a valid track from this playlist
-            attempts = 0
-            max_attempts_per_playlist = 10
-            
-            while attempts < max_attempts_per_playlist:
-                attempts += 1
-                
-                if not playlist_data["items"]:
-                    break
-                
-                # Pick a random track from the playlist
-                item = random.choice(playlist_data["items"])
-                track = item.get("track")
-                
-                if not track or not track.get("id"):
-                    continue
-                
-                # Validate the track
-                if validate_track_lite(track, existing_artist_ids, liked_songs_artist_ids, max_follower_count):
-                    print(f"[SUCCESS] Found valid track from playlist '{playlist_name}': {track['name']} by {track['artists'][0]['name']}")
-                    return track
-            
-            print(f"[INFO] No valid tracks found in playlist '{playlist_name}' after {attempts} attempts")
+                    
+                    playlist_name = pl.get("name", "<unknown>")
+                    
+                    if not playlist_data or "items" not in playlist_data:
+                        print(f"[SKIP] Playlist '{playlist_name}' is empty or inaccessible")
+                        continue
+                    
+                    # Verify the artist is actually in this playlist and count their tracks (one pass)
+                    artist_track_count = 0
+                    for item in playlist_data["items"]:
+                        track = item.get("track")
+                        if artist_id in track_artist_ids(track):
+                            artist_track_count += 1
+                    
+                    if not artist_track_count:
+                        print(f"[SKIP] Playlist '{playlist_name}' doesn't actually contain '{artist_name}'")
+                        continue
+                    
+                    # Skip playlists dominated by this artist (likely artist-focused playlists)
+                    if artist_track_count > 10:
+                        print(f"[SKIP] Playlist '{playlist_name}' has too many tracks by '{artist_name}' ({artist_track_count})")
+                        continue
+                    
+                    playlists_checked += 1
+                    print(f"[INFO] Checking playlist '{playlist_name}' (contains {artist_track_count} tracks by '{artist_name}')...")
+                    
+                    # Try up to 10 distinct random tracks from this playlist,
+                    # skipping removed/local entries up front so they don't use attempts
+                    max_attempts_per_playlist = 10
+                    playable_tracks = [
+                        item["track"] for item in playlist_data["items"]
+                        if item.get("track") and item["track"].get("id")
+                    ]
+                    sampled_tracks = random.sample(
+                        playable_tracks,
+                        min(max_attempts_per_playlist, len(playable_tracks))
+                    )
+                    
+                    for track in sampled_tracks:
+                        # Validate the track
+                        if validate_track_lite(track, existing_artist_ids, liked_songs_artist_ids, max_follower_count):
+                            full_track = track_cached(sp, track["id"])
+                            if not full_track:
+                                continue
+                            print(f"[SUCCESS] Found valid track from playlist '{playlist_name}': {full_track['name']} by {full_track['artists'][0]['name']}")
+                            return full_track
+                    
+                    print(f"[INFO] No valid tracks found in playlist '{playlist_name}' after {len(sampled_tracks)} attempts")
         
         print(f"[INFO] Checked {playlists_checked} playlists, no valid tracks found")
         return None
@@ -1444,7 +2418,11 @@ def search_user_playlists_for_artist(sp, artist_id, artist_name, existing_artist
         print(f"[ERROR] Error searching user playlists: {e}")
         return None
 
-def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_songs_artist_ids=None, max_follower_count=None):
+# Number of seed tracks analysed concurrently per rolled artist (bounds
+# parallel YouTube downloads)
+SEED_ATTEMPT_WORKERS = 4
+
+def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_songs_artist_ids=None, max_follower_count=None, liked_by_artist=None, liked_track_ids=None):
     """
     Real-time track selection following the exact strategy:
     
@@ -1458,10 +2436,12 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
     
     Args:
         max_follower_count: Maximum artist follower count for recommendations (None = no limit)
+        liked_by_artist: Liked songs index from build_liked_songs_index() (built here if not given)
+        liked_track_ids: All liked track IDs, precomputed per run (derived from liked_by_artist if not given)
     """
     
     # Get artist info
-    search_res = safe_spotify_call(sp.search, artist_name, type="artist", limit=1)
+    search_res = search_artist_cached(sp, artist_name)
     if not search_res or "artists" not in search_res or not search_res["artists"].get("items"):
         print(f"[SKIP] No search results for artist: {artist_name}")
         return None
@@ -1478,37 +2458,14 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
     # If one can't be found on YouTube, try another. If none work, signal to re-roll artist.
     
     # Get ALL liked tracks by this artist (not just one random one)
-    artist_liked_tracks = []
-    try:
-        offset = 0
-        limit = 50
-        while True:
-            results = safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset)
-            if not results or not results.get("items"):
-                break
-            
-            for item in results["items"]:
-                track = item.get("track")
-                if not track:
-                    continue
-                
-                # Check if any artist matches
-                for artist in track.get("artists", []):
-                    if artist.get("id") == artist_id:
-                        artist_liked_tracks.append(track["id"])
-                        break
-            
-            if len(results["items"]) < limit:
-                break
-            
-            offset += limit
-    except Exception as e:
-        print(f"[WARN] Could not fetch liked tracks: {e}")
+    if liked_by_artist is None:
+        liked_by_artist = build_liked_songs_index(sp)
+    artist_liked_tracks = list(liked_by_artist.get(artist_id, []))
     
     # If no liked tracks, try artist's top tracks as fallback
     if not artist_liked_tracks:
         print(f"[INFO] No liked tracks found for '{artist_name}', trying top tracks as seed...")
-        top_tracks_res = safe_spotify_call(sp.artist_top_tracks, artist_id, country="US")
+        top_tracks_res = artist_top_tracks_cached(sp, artist_id)
         if top_tracks_res and "tracks" in top_tracks_res and top_tracks_res["tracks"]:
             for track in top_tracks_res["tracks"][:5]:  # Try up to 5 top tracks
                 if track.get("id"):
@@ -1519,27 +2476,9 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
         print(f"[FAIL] No tracks available for '{artist_name}' - WILL RE-ROLL ARTIST")
         return None
     
-    # Get all liked track IDs to exclude from similarity search (fetch once, use for all attempts)
-    liked_track_ids = []
-    try:
-        offset = 0
-        limit = 50
-        while True:
-            results = safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset)
-            if not results or not results.get("items"):
-                break
-            
-            for item in results["items"]:
-                track = item.get("track")
-                if track and track.get("id"):
-                    liked_track_ids.append(track["id"])
-            
-            if len(results["items"]) < limit:
-                break
-            
-            offset += limit
-    except Exception as e:
-        print(f"[WARN] Could not fetch all liked track IDs: {e}")
+    # Get all liked track IDs to exclude from similarity search (same index, use for all attempts)
+    if liked_track_ids is None:
+        liked_track_ids = frozenset(track_id for track_ids in liked_by_artist.values() for track_id in track_ids)
     
     print(f"[INFO] Found {len(artist_liked_tracks)} potential seed tracks for '{artist_name}'")
     print(f"[INFO] Excluding {len(liked_track_ids)} liked tracks from similarity search")
@@ -1548,10 +2487,15 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
     random.shuffle(artist_liked_tracks)  # Randomize order
     max_seed_attempts = min(10, len(artist_liked_tracks))  # Try up to 10 seeds
     
-    for attempt in range(max_seed_attempts):
-        seed_track_id = artist_liked_tracks[attempt]
+    # Seeds are tried SEED_ATTEMPT_WORKERS at a time so one seed's YouTube
+    # download/analysis overlaps with the DB and Spotify work of the others.
+    # The first seed that yields a valid track wins; queued seeds are cancelled
+    # and running ones stop at their next stage once seed_search_done is set.
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    seed_search_done = threading.Event()
+    
+    def try_seed(attempt, seed_track_id):
         print(f"[INFO] Seed attempt {attempt + 1}/{max_seed_attempts}: Trying seed track {seed_track_id[:10]}...")
-        
         similar_track = get_similar_tracks_by_audio_features_db(
             sp, 
             seed_track_id, 
@@ -1559,15 +2503,34 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
             liked_songs_artist_ids,
             liked_track_ids,
             max_follower_count,
-            genre_pool=None  # No genre pool in lite mode - skip Last.fm validation
+            genre_pool=None,  # No genre pool in lite mode - skip Last.fm validation
+            cancel_event=seed_search_done
         )
-        
-        if similar_track:
-            print(f"[SUCCESS] ✓ Found track via audio features: {similar_track['name']} by {similar_track['artists'][0]['name']}")
-            return similar_track
-        else:
+        if not similar_track:
             print(f"[INFO] Seed attempt {attempt + 1} failed, trying next seed track...")
-            # Continue to next seed track
+        return similar_track
+    
+    executor = ThreadPoolExecutor(max_workers=SEED_ATTEMPT_WORKERS)
+    try:
+        futures = [
+            executor.submit(try_seed, attempt, artist_liked_tracks[attempt])
+            for attempt in range(max_seed_attempts)
+        ]
+        
+        for future in as_completed(futures):
+            try:
+                similar_track = future.result()
+            except Exception as e:
+                print(f"[ERROR] Seed attempt failed: {e}")
+                continue
+            
+            if similar_track:
+                print(f"[SUCCESS] ✓ Found track via audio features: {similar_track['name']} by {similar_track['artists'][0]['name']}")
+                return similar_track
+    finally:
+        # Stop seeds that are still running, and drop the ones not started yet
+        seed_search_done.set()
+        executor.shutdown(wait=False, cancel_futures=True)
     
     # REQUIREMENT 4: If we tried up to 10 seed tracks and none worked, signal to re-roll artist
     print(f"[FAIL] All {max_seed_attempts} seed attempts failed for '{artist_name}' - WILL RE-ROLL ARTIST")
@@ -1577,70 +2540,111 @@ def select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_son
     # ===== STEP 5b: Try generating with artist as seed (last resort) =====
     print(f"[5b] Trying seed generation with artist ID as seed for '{artist_name}'...")
     
-    for attempt in range(10):
+    # Repeating an identical request mostly returns the same tracks, so each
+    # attempt uses a different seed combination (Spotify allows 5 seeds total)
+    seed_combinations = [
+        {"seed_artists": [artist_id]},
+        {"seed_artists": [artist_id], "seed_tracks": artist_liked_tracks[:4]},
+    ]
+    
+    seen_track_ids = set()
+    for attempt, seeds in enumerate(seed_combinations):
         try:
-            recs = safe_spotify_call(
-                sp.recommendations,
-                seed_artists=[artist_id],
-                limit=50
-            )
+            recs = safe_spotify_call(sp.recommendations, limit=100, **seeds)
             
             if not recs or "tracks" not in recs:
                 continue
             
-            # Validate tracks
+            # Validate tracks not already checked by an earlier attempt
             for track in recs["tracks"]:
+                if not track or track.get("id") in seen_track_ids:
+                    continue
+                seen_track_ids.add(track.get("id"))
+                
                 if validate_track_lite(track, existing_artist_ids, liked_songs_artist_ids, max_follower_count):
                     print(f"[SUCCESS] Found track via artist seed (attempt {attempt + 1}): {track['name']} by {track['artists'][0]['name']}")
                     return track
             
-            print(f"[INFO] Attempt {attempt + 1}/10: No valid tracks from artist seed recommendations")
+            print(f"[INFO] Attempt {attempt + 1}/{len(seed_combinations)}: No valid tracks from artist seed recommendations")
             
         except Exception as e:
             print(f"[ERROR] Seed generation attempt {attempt + 1} failed: {e}")
     
-    print(f"[5b] Seed generation failed after 10 attempts for '{artist_name}'")
+    print(f"[5b] Seed generation failed after {len(seed_combinations)} attempts for '{artist_name}'")
     print(f"[FAIL] All methods exhausted for '{artist_name}' - will re-roll")
     return None
 
+RECENT_TRACKS_MAX_PAGES = 5  # Limit pages for lite version
+
+def _fetch_recent_tracks_page(username, api_key, page):
+    """Fetch one page of user.getrecenttracks; returns the 'recenttracks' object or None"""
+    url = "http://ws.audioscrobbler.com/2.0/"
+    params = {
+        "method": "user.getrecenttracks",
+        "user": username,
+        "api_key": api_key,
+        "format": "json",
+        "page": page,
+        "limit": 200
+    }
+    
+    lastfm_throttle()
+    response = _LASTFM_SESSION.get(url, params=params, timeout=10)
+    data = parse_json_response(response)
+    
+    if "recenttracks" not in data or "track" not in data["recenttracks"]:
+        return None
+    return data["recenttracks"]
+
 def fetch_all_recent_tracks(username=None, api_key=None):
-    """Simplified recent tracks fetching"""
+    """
+    Simplified recent tracks fetching
+    
+    Page 1 is fetched first to learn totalPages; the remaining pages (up to
+    RECENT_TRACKS_MAX_PAGES) are then fetched concurrently.
+    """
     if not username or not api_key:
         return []
     
     recent_tracks = []
-    page = 1
     
     try:
-        while page <= 5:  # Limit pages for lite version
-            url = "http://ws.audioscrobbler.com/2.0/"
-            params = {
-                "method": "user.getrecenttracks",
-                "user": username,
-                "api_key": api_key,
-                "format": "json",
-                "page": page,
-                "limit": 200
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if "recenttracks" not in data or "track" not in data["recenttracks"]:
-                break
-                
-            tracks = data["recenttracks"]["track"]
-            if not tracks:
-                break
-                
-            recent_tracks.extend(tracks)
-            page += 1
+        from concurrent.futures import ThreadPoolExecutor
+        
+        first_page = _fetch_recent_tracks_page(username, api_key, 1)
+        if not first_page or not first_page["track"]:
+            return recent_tracks
+        recent_tracks.extend(first_page["track"])
+        
+        try:
+            total_pages = int(first_page.get("@attr", {}).get("totalPages", RECENT_TRACKS_MAX_PAGES))
+        except (TypeError, ValueError):
+            total_pages = RECENT_TRACKS_MAX_PAGES
+        
+        pages = list(range(2, min(total_pages, RECENT_TRACKS_MAX_PAGES) + 1))
+        if pages:
+            with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+                for page_data in executor.map(lambda page: _fetch_recent_tracks_page(username, api_key, page), pages):
+                    if not page_data or not page_data["track"]:
+                        break
+                    recent_tracks.extend(page_data["track"])
             
     except Exception as e:
         print(f"[ERROR] Error fetching recent tracks: {e}")
     
     return recent_tracks
 
+def _count_artist_names(artist_play_map, tracks, weight):
+    """Add weight to artist_play_map (a Counter) for every artist credited on each track"""
+    lower = str.lower
+    for track in tracks:
+        if not track:
+            continue
+        for artist in track.get("artists") or ():
+            name = artist.get("name")
+            if name:
+                artist_play_map[lower(name)] += weight
+
 def fetch_spotify_listening_data(sp):
     """
     Fetch user listening data from Spotify (recently played + top tracks)
@@ -1649,57 +2653,46 @@ def fetch_spotify_listening_data(sp):
     Returns:
         dict: {artist_name_lower: play_count} with higher weights for recent + frequent plays
     """
-    artist_play_map = {}
+    from collections import Counter
+    
+    artist_play_map = Counter()
     
     try:
-        # 1. Get recently played tracks (last 50)
-        print("[INFO] Fetching recently played tracks from Spotify...")
-        recently_played = safe_spotify_call(sp.current_user_recently_played, limit=50)
-        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # The three sources are independent - request them together
+        print("[INFO] Fetching recently played and top tracks from Spotify...")
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            recently_played_future = executor.submit(safe_spotify_call, sp.current_user_recently_played, limit=50)
+            top_short_future = executor.submit(safe_spotify_call, sp.current_user_top_tracks, limit=50, time_range="short_term")
+            top_medium_future = executor.submit(safe_spotify_call, sp.current_user_top_tracks, limit=50, time_range="medium_term")
+            recently_played = recently_played_future.result()
+            top_tracks_short = top_short_future.result()
+            top_tracks_medium = top_medium_future.result()
+        
+        # 1. Recently played tracks (last 50)
         if recently_played and "items" in recently_played:
-            for item in recently_played["items"]:
-                track = item.get("track")
-                if not track:
-                    continue
-                
-                for artist in track.get("artists", []):
-                    artist_name = artist.get("name", "").lower()
-                    if artist_name:
-                        # Weight recent plays higher (3x)
-                        artist_play_map[artist_name] = artist_play_map.get(artist_name, 0) + 3
+            # Weight recent plays higher (3x)
+            _count_artist_names(artist_play_map, (item.get("track") for item in recently_played["items"]), 3)
             
             print(f"[INFO] Found {len(recently_played['items'])} recently played tracks")
         
-        # 2. Get top tracks - short term (last 4 weeks)
-        print("[INFO] Fetching top tracks (short term) from Spotify...")
-        top_tracks_short = safe_spotify_call(sp.current_user_top_tracks, limit=50, time_range="short_term")
-        
+        # 2. Top tracks - short term (last 4 weeks)
         if top_tracks_short and "items" in top_tracks_short:
-            for track in top_tracks_short["items"]:
-                for artist in track.get("artists", []):
-                    artist_name = artist.get("name", "").lower()
-                    if artist_name:
-                        # Weight short-term tops high (2x)
-                        artist_play_map[artist_name] = artist_play_map.get(artist_name, 0) + 2
+            # Weight short-term tops high (2x)
+            _count_artist_names(artist_play_map, top_tracks_short["items"], 2)
             
             print(f"[INFO] Found {len(top_tracks_short['items'])} short-term top tracks")
         
-        # 3. Get top tracks - medium term (last 6 months)
-        print("[INFO] Fetching top tracks (medium term) from Spotify...")
-        top_tracks_medium = safe_spotify_call(sp.current_user_top_tracks, limit=50, time_range="medium_term")
-        
+        # 3. Top tracks - medium term (last 6 months)
         if top_tracks_medium and "items" in top_tracks_medium:
-            for track in top_tracks_medium["items"]:
-                for artist in track.get("artists", []):
-                    artist_name = artist.get("name", "").lower()
-                    if artist_name:
-                        # Weight medium-term tops moderately (1x)
-                        artist_play_map[artist_name] = artist_play_map.get(artist_name, 0) + 1
+            # Weight medium-term tops moderately (1x)
+            _count_artist_names(artist_play_map, top_tracks_medium["items"], 1)
             
             print(f"[INFO] Found {len(top_tracks_medium['items'])} medium-term top tracks")
         
         print(f"[INFO] Built Spotify listening data for {len(artist_play_map)} unique artists")
-        return artist_play_map
+        return dict(artist_play_map)
         
     except Exception as e:
         print(f"[ERROR] Error fetching Spotify listening data: {e}")
@@ -1725,7 +2718,89 @@ def build_artist_play_map(recent_tracks, days_limit=365):
     
     return artist_play_map
 
-def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs=3):
+# Listening data (lottery weights) changes slowly, so it is kept on disk between runs
+LISTENING_CACHE_DIR = os.environ.get(
+    "LISTENING_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "playlist-gen")
+)
+LISTENING_CACHE_TTL = int(os.environ.get("LISTENING_CACHE_TTL", 6 * 60 * 60))  # seconds
+
+def _listening_cache_path(cache_key):
+    digest = hashlib.sha1(cache_key.encode("utf-8")).hexdigest()
+    return os.path.join(LISTENING_CACHE_DIR, f"listening-{digest}.json")
+
+def load_cached_listening_data(cache_key):
+    """Return the cached artist play map for cache_key, or None if missing/expired"""
+    path = _listening_cache_path(cache_key)
+    try:
+        if time.time() - os.path.getmtime(path) > LISTENING_CACHE_TTL:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+def save_cached_listening_data(cache_key, artist_play_map):
+    """Write the artist play map to the disk cache (best effort)"""
+    if not artist_play_map:
+        return
+    path = _listening_cache_path(cache_key)
+    try:
+        os.makedirs(LISTENING_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            if ORJSON_AVAILABLE:
+                f.write(orjson.dumps(artist_play_map))
+            else:
+                f.write(json.dumps(artist_play_map).encode("utf-8"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARN] Could not write listening data cache: {e}")
+
+def get_artist_play_map(sp, lastfm_username=None):
+    """
+    Get listening data for lottery weights, from the disk cache when fresh
+    
+    Uses Last.fm recent tracks if a username is given (and an API key is set),
+    otherwise Spotify recently played + top tracks. Cached per Last.fm username
+    or Spotify user ID for LISTENING_CACHE_TTL seconds.
+    
+    Returns:
+        dict: {artist_name_lower: play_count}
+    """
+    if lastfm_username and LASTFM_API_KEY:
+        cache_key = f"lastfm:{lastfm_username.lower()}"
+    else:
+        current_user = safe_spotify_call(sp.current_user)
+        cache_key = f"spotify:{current_user['id']}" if current_user and current_user.get("id") else None
+    
+    if cache_key:
+        cached = load_cached_listening_data(cache_key)
+        if cached is not None:
+            print(f"[INFO] Using cached listening data ({len(cached)} artists)")
+            return cached
+    
+    if lastfm_username and LASTFM_API_KEY:
+        # Use Last.fm data if username provided
+        print("[INFO] Fetching Last.fm recent tracks...")
+        recent_tracks = fetch_all_recent_tracks(lastfm_username, LASTFM_API_KEY)
+        artist_play_map = build_artist_play_map(recent_tracks)
+        print(f"[INFO] Found {len(recent_tracks)} recent tracks, {len(artist_play_map)} unique artists from Last.fm")
+    else:
+        # Otherwise use Spotify listening data
+        print("[INFO] No Last.fm username provided. Using Spotify listening data...")
+        artist_play_map = fetch_spotify_listening_data(sp)
+    
+    if cache_key:
+        save_cached_listening_data(cache_key, artist_play_map)
+    return artist_play_map
+
+# Lottery base weight by number of liked songs: 1 -> 1, 2 -> 3, 3-4 -> 5, 5-9 -> 7, 10+ -> 10
+LIKED_COUNT_THRESHOLDS = (1, 2, 3, 5, 10)
+LIKED_COUNT_WEIGHTS = (1, 3, 5, 7, 10)
+
+def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs=3, liked_items=None):
     """
     Build fresh artist list from user's current liked songs
     Filters to only include artists with listening activity in last 6 months
@@ -1735,6 +2810,7 @@ def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs
         sp: Spotify client
         artist_play_map: Optional map of artist listening data
         min_liked_songs: Minimum number of liked songs required per artist (default 3)
+        liked_items: Items from fetch_liked_song_items() (fetched here if not given)
     
     Returns:
         dict of {artist_id: {name, total_liked, weight}}
@@ -1743,37 +2819,22 @@ def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs
     artist_counts = {}
     
     try:
-        offset = 0
-        limit = 50
-        
-        while True:
-            results = safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset)
-            if not results or not results.get("items"):
-                break
-            
-            for item in results["items"]:
-                track = item.get("track")
-                if track and "artists" in track:
-                    for artist in track["artists"]:
-                        artist_id = artist.get("id")
-                        artist_name = artist.get("name")
-                        
-                        if artist_id and artist_name:
-                            if artist_id not in artist_counts:
-                                artist_counts[artist_id] = {
-                                    "name": artist_name,
-                                    "total_liked": 0
-                                }
-                            artist_counts[artist_id]["total_liked"] += 1
-            
-            if len(results["items"]) < limit:
-                break
-            
-            offset += limit
-            
-            if offset % 500 == 0:
-                print(f"[INFO] Processed {offset} liked songs...")
-                time.sleep(0.5)
+        if liked_items is None:
+            liked_items = fetch_liked_song_items(sp)
+        for item in liked_items:
+            track = item.get("track")
+            if track and "artists" in track:
+                for artist in track["artists"]:
+                    artist_id = artist.get("id")
+                    artist_name = artist.get("name")
+                    
+                    if artist_id and artist_name:
+                        if artist_id not in artist_counts:
+                            artist_counts[artist_id] = {
+                                "name": artist_name,
+                                "total_liked": 0
+                            }
+                        artist_counts[artist_id]["total_liked"] += 1
         
         print(f"[INFO] Found {len(artist_counts)} unique artists in liked songs")
         
@@ -1795,12 +2856,14 @@ def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs
         
         # If artist_play_map provided (from Spotify listening data), it already contains 6-month data
         if artist_play_map:
-            for artist_name_lower in artist_play_map.keys():
-                # Find matching artist_id from artist_counts
-                for artist_id, info in artist_counts.items():
-                    if info["name"].lower() == artist_name_lower:
-                        artists_with_recent_activity.add(artist_id)
-                        break
+            # Map lowercase names to the first matching artist_id from artist_counts
+            name_lower_to_id = {}
+            for artist_id, info in artist_counts.items():
+                name_lower_to_id.setdefault(info["name"].lower(), artist_id)
+            
+            artists_with_recent_activity = {
+                name_lower_to_id[name] for name in artist_play_map if name in name_lower_to_id
+            }
         
         # Filter artist_counts to only include recently active artists
         if artists_with_recent_activity:
@@ -1821,16 +2884,7 @@ def build_artist_list_from_liked_songs(sp, artist_play_map=None, min_liked_songs
             artist_name_lower = info["name"].lower()
             
             # Weight formula: MORE liked songs = HIGHER weight (prefer artists you already love)
-            if total_liked >= 10:
-                base_weight = 10
-            elif total_liked >= 5:
-                base_weight = 7
-            elif total_liked >= 3:
-                base_weight = 5
-            elif total_liked == 2:
-                base_weight = 3
-            else:  # total_liked == 1
-                base_weight = 1
+            base_weight = LIKED_COUNT_WEIGHTS[max(bisect.bisect_right(LIKED_COUNT_THRESHOLDS, total_liked) - 1, 0)]
             
             # Boost for recent listening activity (applies additional weight for recently played)
             if artist_play_map and artist_name_lower in artist_play_map:
@@ -1860,7 +2914,13 @@ def remove_old_tracks_from_playlist(sp, playlist_id, days_old=7):
         limit = 100
         
         while True:
-            tracks_data = safe_spotify_call(sp.playlist_items, playlist_id, offset=offset, limit=limit)
+            tracks_data = safe_spotify_call(
+                sp.playlist_items,
+                playlist_id,
+                offset=offset,
+                limit=limit,
+                fields="items(added_at,track(uri)),next"
+            )
             if not tracks_data or not tracks_data.get("items"):
                 break
             
@@ -1878,7 +2938,7 @@ def remove_old_tracks_from_playlist(sp, playlist_id, days_old=7):
                     except:
                         continue
             
-            if len(tracks_data["items"]) < limit:
+            if not tracks_data.get("next"):
                 break
             offset += limit
         
@@ -1903,15 +2963,87 @@ def remove_old_tracks_from_playlist(sp, playlist_id, days_old=7):
         print(f"[ERROR] Error removing old tracks: {e}")
         return 0
 
+# Spotify accepts at most 100 URIs per add-items request
+PLAYLIST_ADD_BATCH_SIZE = 100
+
+def add_tracks_to_playlist(sp, playlist_id, track_uris, existing_track_ids=None):
+    """
+    Append tracks to a playlist in 100-URI requests
+    
+    Chunks are sent one after another on spotipy's keep-alive session: each
+    request appends at the current end of the playlist, so concurrent chunks
+    would land in arbitrary order and race on the playlist snapshot.
+    
+    Duplicate URIs are dropped (first occurrence kept) before batching, as
+    are tracks whose ID is in existing_track_ids (already in the playlist).
+    
+    Returns:
+        Number of URIs successfully added
+    """
+    track_uris = list(dict.fromkeys(track_uris))
+    if existing_track_ids:
+        new_uris = [uri for uri in track_uris if uri.rsplit(":", 1)[-1] not in existing_track_ids]
+        if len(new_uris) < len(track_uris):
+            print(f"[INFO] Skipping {len(track_uris) - len(new_uris)} tracks already in the playlist")
+        track_uris = new_uris
+    if not track_uris:
+        return 0
+
+    added = 0
+    for i in range(0, len(track_uris), PLAYLIST_ADD_BATCH_SIZE):
+        batch = track_uris[i:i + PLAYLIST_ADD_BATCH_SIZE]
+        # safe_spotify_call already logs and swallows Spotify/network errors
+        if safe_spotify_call(sp.playlist_add_items, playlist_id, batch):
+            added += len(batch)
+        else:
+            print(f"[ERROR] Failed to add tracks {i + 1}-{i + len(batch)} to playlist")
+    return added
+
+LOTTERY_REJECTION_TRIES = 20
+
+def draw_lottery_artist(artist_ids, cum_weights, rolled_artist_ids):
+    """
+    Weighted draw of an artist that has not been rolled yet
+    
+    Draws from the full weight table and rejects already-rolled artists, which
+    is equivalent to drawing from the remaining artists' weights. Falls back to
+    an explicit draw over the remaining artists once most of them are rolled.
+    
+    Args:
+        artist_ids: List of candidate artist IDs
+        cum_weights: Cumulative weights matching artist_ids
+        rolled_artist_ids: Set of artist IDs already drawn
+    
+    Returns:
+        An artist ID, or None if every artist has been rolled
+    """
+    if len(rolled_artist_ids) >= len(artist_ids):
+        return None
+    
+    for _ in range(LOTTERY_REJECTION_TRIES):
+        aid = random.choices(artist_ids, cum_weights=cum_weights, k=1)[0]
+        if aid not in rolled_artist_ids:
+            return aid
+    
+    available = [i for i, aid in enumerate(artist_ids) if aid not in rolled_artist_ids]
+    if not available:
+        return None
+    weights = [cum_weights[i] - (cum_weights[i - 1] if i else 0) for i in available]
+    return artist_ids[random.choices(available, weights=weights, k=1)[0]]
+
+def track_artist_ids(track):
+    """Return the frozenset of artist IDs credited on a track object (empty for None)"""
+    if not track:
+        return frozenset()
+    return frozenset(a["id"] for a in track.get("artists") or () if a.get("id"))
+
 def build_existing_artist_ids(tracks):
     """Build set of existing artist IDs in playlist"""
-    ids = set()
-    for t in tracks:
-        if t and "track" in t and t["track"] and "artists" in t["track"]:
-            for artist in t["track"]["artists"]:
-                if artist.get("id"):
-                    ids.add(artist["id"])
-    return ids
+    return {
+        a["id"]
+        for t in tracks if t and (track := t.get("track"))
+        for a in track.get("artists") or () if a.get("id")
+    }
 
 def check_tracks_in_liked_songs(sp, track_ids):
     """
@@ -1946,54 +3078,68 @@ def check_tracks_in_liked_songs(sp, track_ids):
         print(f"[WARN] Error checking tracks in liked songs: {e}")
         return set()
 
-def fetch_liked_songs_artist_ids(sp):
+def fetch_liked_songs_artist_ids(sp, liked_items=None):
     """
     Fetch all artist IDs from user's liked songs
     Returns a set of artist IDs to exclude from recommendations
+    
+    liked_items: Items from fetch_liked_song_items() (fetched here if not given)
     """
     print("[INFO] Fetching user's liked songs to build exclusion list...")
     liked_artist_ids = set()
     
     try:
-        offset = 0
-        limit = 50
-        
-        while True:
-            results = safe_spotify_call(sp.current_user_saved_tracks, limit=limit, offset=offset)
-            if not results or not results.get("items"):
-                break
-            
-            for item in results["items"]:
-                track = item.get("track")
-                if track and "artists" in track:
-                    for artist in track["artists"]:
-                        artist_id = artist.get("id")
-                        if artist_id:
-                            liked_artist_ids.add(artist_id)
-            
-            # Check if we've reached the end
-            if len(results["items"]) < limit:
-                break
-            
-            offset += limit
-            
-            # Add a small delay to avoid rate limiting
-            if offset % 500 == 0:
-                print(f"[INFO] Fetched {offset} liked songs so far...")
-                time.sleep(0.5)
+        items = liked_items if liked_items is not None else fetch_liked_song_items(sp)
+        for item in items:
+            liked_artist_ids.update(track_artist_ids(item.get("track")))
         
-        print(f"[INFO] Found {len(liked_artist_ids)} unique artists in {offset} liked songs")
+        print(f"[INFO] Found {len(liked_artist_ids)} unique artists in {len(items)} liked songs")
         return liked_artist_ids
         
     except Exception as e:
         print(f"[ERROR] Error fetching liked songs: {e}")
         return set()  # Return empty set on error, don't fail the entire process
 
+ERROR_MESSAGE_MAX_LENGTH = 300  # Cap on error strings returned to the web app
+
+def summarize_exception(e):
+    """
+    Build a bounded "Type: message" string for a failed run.
+    
+    HTTP errors can stringify to the full request URL plus response body,
+    so the message is truncated to ERROR_MESSAGE_MAX_LENGTH characters.
+    
+    Args:
+        e: The exception that ended the run
+    
+    Returns:
+        Short error string suitable for the result payload
+    """
+    message = f"{type(e).__name__}: {e.args[0] if e.args else ''}"
+    if len(message) > ERROR_MESSAGE_MAX_LENGTH:
+        message = message[:ERROR_MESSAGE_MAX_LENGTH - 3] + "..."
+    return message
+
+@dataclass(slots=True, frozen=True)
+class LiteResult:
+    """Outcome of run_lite_script(); call to_dict() where a JSON payload is needed"""
+    success: bool
+    tracks_added: int = 0
+    tracks_removed: int = 0
+    playlist_id: str | None = None
+    error: str | None = None
+    
+    def to_dict(self):
+        return asdict(self)
+
 def run_lite_script(sp, output_playlist_id, max_songs=10, lastfm_username=None, max_follower_count=None):
     """
     Main lite script function - runs fresh each time with no caching
     Scans liked songs in real-time and generates recommendations
     
+    Returns:
+        LiteResult
+    
     Args:
         max_follower_count: Maximum artist follower count (None = no limit)
                            Popular: None
@@ -2002,63 +3148,55 @@ def run_lite_script(sp, output_playlist_id, max_songs=10, lastfm_username=None,
                            Niche: 50000
                            Very Niche: 25000
     """
+    selected_tracks = []
     try:
         follower_desc = f"max {max_follower_count:,} followers" if max_follower_count else "no follower limit"
         print(f"[INFO] Starting fresh recommendation run for playlist {output_playlist_id} ({follower_desc})")
         
-        # Get listening data for lottery weights
-        artist_play_map = {}
-        if lastfm_username and LASTFM_API_KEY:
-            # Use Last.fm data if username provided
-            print("[INFO] Fetching Last.fm recent tracks...")
-            recent_tracks = fetch_all_recent_tracks(lastfm_username, LASTFM_API_KEY)
-            artist_play_map = build_artist_play_map(recent_tracks)
-            print(f"[INFO] Found {len(recent_tracks)} recent tracks, {len(artist_play_map)} unique artists from Last.fm")
-        else:
-            # Otherwise use Spotify listening data
-            print("[INFO] No Last.fm username provided. Using Spotify listening data...")
-            artist_play_map = fetch_spotify_listening_data(sp)
+        # Listening data (lottery weights), liked songs and the target playlist
+        # are independent, so all three are fetched at the same time
+        from concurrent.futures import ThreadPoolExecutor
         
-        # Build fresh artist list from current liked songs
         print("[INFO] Scanning liked songs to build artist list...")
-        artists_data = build_artist_list_from_liked_songs(sp, artist_play_map)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            play_map_future = executor.submit(get_artist_play_map, sp, lastfm_username)
+            liked_items_future = executor.submit(fetch_liked_song_items, sp)
+            playlist_items_future = executor.submit(
+                fetch_playlist_items, sp, output_playlist_id, "items(track(artists(id)))"
+            )
+            artist_play_map = play_map_future.result()
+            # Fetched once per run - the artist list and the seed index share it
+            liked_items = liked_items_future.result()
+            playlist_items = playlist_items_future.result()
+        
+        artists_data = build_artist_list_from_liked_songs(sp, artist_play_map, liked_items=liked_items)
         
         if not artists_data:
             print("[ERROR] No artists found in liked songs!")
-            return {
-                "success": False,
-                "error": "No artists found in your liked songs. Please add some liked songs first.",
-                "tracks_added": 0,
-                "tracks_removed": 0
-            }
+            return LiteResult(
+                success=False,
+                error="No artists found in your liked songs. Please add some liked songs first."
+            )
         
         # Fetch liked songs artist IDs for exclusion (same data, different format for efficient lookup)
-        liked_songs_artist_ids = set(artists_data.keys())
+        liked_songs_artist_ids = frozenset(artists_data)
         print(f"[INFO] Will exclude {len(liked_songs_artist_ids)} artists from liked songs")
         
-        # Get current playlist tracks to avoid duplicates
-        playlist_items = []
-        offset = 0
-        while True:
-            items = safe_spotify_call(sp.playlist_items, output_playlist_id, offset=offset, limit=100)
-            if not items or not items.get("items"):
-                break
-            playlist_items.extend(items["items"])
-            if len(items["items"]) < 100:
-                break
-            offset += 100
-        
+        # Current playlist tracks, to avoid duplicates
         existing_artist_ids = build_existing_artist_ids(playlist_items)
         print(f"[INFO] Found {len(existing_artist_ids)} existing artists in target playlist")
         
+        # Index liked songs by artist once - every seed lookup below is served from it
+        liked_by_artist = build_liked_songs_index(sp, liked_items)
+        liked_track_ids = frozenset(track_id for track_ids in liked_by_artist.values() for track_id in track_ids)
+        
         # Select artists and find tracks using weighted lottery
-        selected_tracks = []
         attempts = 0
         max_attempts = max_songs * 10  # Allow more attempts since we're re-rolling on failure
         
         # Build weight lists for weighted selection
         artist_ids = list(artists_data.keys())
-        artist_weights = [artists_data[aid]["weight"] for aid in artist_ids]
+        artist_cum_weights = list(itertools.accumulate(artists_data[aid]["weight"] for aid in artist_ids))
         
         # Track which artists have been rolled (never roll same artist twice)
         rolled_artist_ids = set()
@@ -2066,37 +3204,28 @@ def run_lite_script(sp, output_playlist_id, max_songs=10, lastfm_username=None,
         while len(selected_tracks) < max_songs and attempts < max_attempts:
             attempts += 1
             
-            # Check if we have any artists left to roll
-            available_artists = [aid for aid in artist_ids if aid not in rolled_artist_ids]
-            if not available_artists:
-                print("[WARN] All artists have been rolled, cannot find more tracks")
-                break
-            
             try:
                 # Weighted random selection from liked songs artists (excluding already rolled)
-                available_weights = [
-                    artist_weights[artist_ids.index(aid)] 
-                    for aid in available_artists
-                ]
+                selected_aid = draw_lottery_artist(artist_ids, artist_cum_weights, rolled_artist_ids)
+                if selected_aid is None:
+                    print("[WARN] All artists have been rolled, cannot find more tracks")
+                    break
                 
-                selected_aid = random.choices(available_artists, weights=available_weights, k=1)[0]
                 artist_info = artists_data[selected_aid]
                 artist_name = artist_info.get("name", "")
                 
                 # Mark this artist as rolled (can never be rolled again)
                 rolled_artist_ids.add(selected_aid)
                 
-                print(f"\n[LOTTERY] Attempt {attempts}: Rolled '{artist_name}' (liked {artist_info['total_liked']} songs, {len(available_artists)-1} artists remaining)")
+                print(f"\n[LOTTERY] Attempt {attempts}: Rolled '{artist_name}' (liked {artist_info['total_liked']} songs, {len(artist_ids) - len(rolled_artist_ids)} artists remaining)")
                 
                 # Find tracks by similar artists (NOT by the selected artist themselves)
-                track = select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_songs_artist_ids, max_follower_count)
+                track = select_track_for_artist_lite(sp, artist_name, existing_artist_ids, liked_songs_artist_ids, max_follower_count, liked_by_artist=liked_by_artist, liked_track_ids=liked_track_ids)
                 
                 if track:
                     selected_tracks.append(track)
                     # Add artist to existing set to avoid duplicates
-                    for artist in track["artists"]:
-                        if artist.get("id"):
-                            existing_artist_ids.add(artist["id"])
+                    existing_artist_ids.update(track_artist_ids(track))
                     print(f"[SUCCESS] ✓ Found track {len(selected_tracks)}/{max_songs}: {track['name']} by {track['artists'][0]['name']}\n")
                 else:
                     print(f"[FAIL] ✗ All methods exhausted for '{artist_name}' - re-rolling lottery\n")
@@ -2110,35 +3239,40 @@ def run_lite_script(sp, output_playlist_id, max_songs=10, lastfm_username=None,
         if selected_tracks:
             print(f"[INFO] Discovery complete! Adding {len(selected_tracks)} tracks to playlist...")
             track_uris = [track["uri"] for track in selected_tracks]
-            try:
-                result = safe_spotify_call(sp.playlist_add_items, output_playlist_id, track_uris)
-                if result:
-                    print(f"[SUCCESS] Added {len(selected_tracks)} new tracks to playlist")
-                else:
-                    print("[ERROR] Failed to add tracks to playlist")
-            except Exception as e:
-                print(f"[ERROR] Error adding tracks to playlist: {e}")
+            added_count = add_tracks_to_playlist(sp, output_playlist_id, track_uris)
+            if added_count:
+                print(f"[SUCCESS] Added {added_count} new tracks to playlist")
+            else:
+                print("[ERROR] Failed to add tracks to playlist")
         else:
             print("[WARNING] No tracks were selected")
         
-        result = {
-            "success": True,
-            "tracks_added": len(selected_tracks) if 'selected_tracks' in locals() else 0,
-            "tracks_removed": 0,  # Old track removal logic removed
-            "playlist_id": output_playlist_id
-        }
+        result = LiteResult(
+            success=True,
+            tracks_added=len(selected_tracks),
+            tracks_removed=0,  # Old track removal logic removed
+            playlist_id=output_playlist_id
+        )
         
         print(f"[INFO] Lite script completed successfully: {result}")
         return result
         
     except Exception as e:
-        print(f"[FATAL ERROR] Lite script failed: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "tracks_added": 0,
-            "tracks_removed": 0
-        }
+        error = summarize_exception(e)
+        print(f"[FATAL ERROR] Lite script failed: {error}")
+        return LiteResult(success=False, error=error)
+
+def enhanced_failure_result(error):
+    """
+    Build the failure payload returned by run_enhanced_recommendation_script.
+    
+    Args:
+        error: Human-readable error message
+    
+    Returns:
+        Result dict with a fresh (empty) added_songs list
+    """
+    return {"success": False, "error": error, "tracks_added": 0, "added_songs": []}
 
 def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, lastfm_username=None, max_follower_count=None, min_liked_songs=3, generation_mode='liked_songs', source_url=None, job_id=None, running_jobs=None, enable_genre_matching=False, exclude_liked_songs=False, genre_matching_mode='strict', create_new_playlist=False):
     """
@@ -2180,6 +3314,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         else:
             print(f"[PROGRESS] (No job tracking) {progress:.1f}% - {status_message}")
     
+    conn = None
     try:
         follower_desc = f"max {max_follower_count:,} followers" if max_follower_count else "no follower limit"
         print(f"[INFO] Starting enhanced recommendation run for playlist {output_playlist_id} ({follower_desc})")
@@ -2187,16 +3322,12 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         # Connect to database
         conn = get_db_connection()
         if not conn:
-            return {
-                "success": False,
-                "error": "Could not connect to audio features database",
-                "tracks_added": 0,
-                "added_songs": []
-            }
+            return enhanced_failure_result("Could not connect to audio features database")
         
         # Handle different generation modes
         seed_track_ids = []
         source_description = ""
+        liked_items = None  # Liked songs, fetched at most once per run
         
         if generation_mode == 'liked_songs':
             # Original mode: lottery from liked songs
@@ -2204,43 +3335,26 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
             update_progress(10, "Analyzing your liked songs...")
             
             # Get listening data for lottery weights
-            artist_play_map = {}
-            if lastfm_username and LASTFM_API_KEY:
-                print("[INFO] Fetching Last.fm recent tracks...")
-                recent_tracks = fetch_all_recent_tracks(lastfm_username, LASTFM_API_KEY)
-                artist_play_map = build_artist_play_map(recent_tracks)
-                print(f"[INFO] Found {len(recent_tracks)} recent tracks, {len(artist_play_map)} unique artists from Last.fm")
-            else:
-                print("[INFO] No Last.fm username provided. Using Spotify listening data...")
-                artist_play_map = fetch_spotify_listening_data(sp)
+            artist_play_map = get_artist_play_map(sp, lastfm_username)
             
             # Build fresh artist list from current liked songs (with minimum filter)
             print("[INFO] Scanning liked songs to build artist list...")
             update_progress(20, "Building artist list from your library...")
-            artists_data = build_artist_list_from_liked_songs(sp, artist_play_map, min_liked_songs)
+            liked_items = fetch_liked_song_items(sp)
+            artists_data = build_artist_list_from_liked_songs(sp, artist_play_map, min_liked_songs, liked_items=liked_items)
             
             if not artists_data:
                 print("[ERROR] No artists found in liked songs!")
-                conn.close()
-                return {
-                    "success": False,
-                    "error": f"No artists found with at least {min_liked_songs} liked songs. Try lowering the minimum liked songs filter.",
-                    "tracks_added": 0,
-                    "added_songs": []
-                }
+                release_db_connection(conn)
+                return enhanced_failure_result(f"No artists found with at least {min_liked_songs} liked songs. Try lowering the minimum liked songs filter.")
             
             source_description = "liked songs"
             
         else:
             # Alternative modes: track, artist, album, playlist
             if not source_url:
-                conn.close()
-                return {
-                    "success": False,
-                    "error": f"Source URL is required for {generation_mode} mode",
-                    "tracks_added": 0,
-                    "added_songs": []
-                }
+                release_db_connection(conn)
+                return enhanced_failure_result(f"Source URL is required for {generation_mode} mode")
             
             try:
                 update_progress(10, f"Fetching {generation_mode} data from Spotify...")
@@ -2251,13 +3365,8 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                 update_progress(25, f"Found {len(seed_tracks)} tracks from {source_description}")
                 
                 if not seed_tracks:
-                    conn.close()
-                    return {
-                        "success": False,
-                        "error": f"No tracks found from {source_description}",
-                        "tracks_added": 0,
-                        "added_songs": []
-                    }
+                    release_db_connection(conn)
+                    return enhanced_failure_result(f"No tracks found from {source_description}")
                 
                 # Build ID list and ID-to-track mapping for efficient lookups
                 seed_track_ids = [t['id'] for t in seed_tracks]
@@ -2267,37 +3376,35 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                 artists_data = None
                 
             except Exception as e:
-                conn.close()
-                return {
-                    "success": False,
-                    "error": f"Failed to fetch tracks from source: {str(e)}",
-                    "tracks_added": 0,
-                    "added_songs": []
-                }
+                release_db_connection(conn)
+                return enhanced_failure_result(f"Failed to fetch tracks from source: {str(e)}")
         
         # Only fetch liked songs upfront for liked_songs mode OR if exclude_liked_songs is enabled
         # For other modes without exclude flag, we'll check after generation (lazy loading)
         liked_songs_artist_ids = set()
         liked_track_ids = set()
+        liked_by_artist = {}
+        liked_track_names = {}
         
         if generation_mode == 'liked_songs' or (generation_mode != 'liked_songs' and exclude_liked_songs):
             mode_desc = "liked_songs mode" if generation_mode == 'liked_songs' else "exclude_liked_songs enabled"
-            print(f"[INFO] Fetching liked track IDs for exclusion ({mode_desc})...")
-            offset = 0
-            while True:
-                results = safe_spotify_call(sp.current_user_saved_tracks, limit=50, offset=offset)
-                if not results or not results.get("items"):
-                    break
-                for item in results["items"]:
-                    track = item.get("track")
-                    if track and track.get("id"):
-                        liked_track_ids.add(track["id"])
-                        for artist in track.get("artists", []):
-                            if artist.get("id"):
-                                liked_songs_artist_ids.add(artist["id"])
-                if len(results["items"]) < 50:
-                    break
-                offset += 50
+            print(f"[INFO] Collecting liked track IDs for exclusion ({mode_desc})...")
+            if liked_items is None:
+                liked_items = fetch_liked_song_items(sp)
+            liked_by_artist = build_liked_songs_index(sp, liked_items)
+            liked_track_names = {
+                item["track"]["id"]: item["track"].get("name", "")
+                for item in liked_items
+                if item.get("track") and item["track"].get("id")
+            }
+            for item in liked_items:
+                track = item.get("track")
+                if track and track.get("id"):
+                    liked_track_ids.add(track["id"])
+                    liked_songs_artist_ids.update(track_artist_ids(track))
+            # Fixed for the rest of the run
+            liked_songs_artist_ids = frozenset(liked_songs_artist_ids)
+            liked_track_ids = frozenset(liked_track_ids)
             print(f"[INFO] Will exclude {len(liked_songs_artist_ids)} artists and {len(liked_track_ids)} tracks from liked songs")
         else:
             print(f"[INFO] Skipping upfront liked songs fetch (not in liked_songs mode) - will check after generation")
@@ -2308,19 +3415,11 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         existing_artist_ids = set()
         
         if not create_new_playlist and output_playlist_id:
-            offset = 0
-            while True:
-                items = safe_spotify_call(sp.playlist_items, output_playlist_id, offset=offset, limit=100)
-                if not items or not items.get("items"):
-                    break
-                playlist_items.extend(items["items"])
-                for item in items["items"]:
-                    track = item.get("track")
-                    if track and track.get("id"):
-                        playlist_track_ids.add(track["id"])
-                if len(items["items"]) < 100:
-                    break
-                offset += 100
+            playlist_items = fetch_playlist_items(sp, output_playlist_id, "items(track(id,artists(id)))")
+            for item in playlist_items:
+                track = item.get("track")
+                if track and track.get("id"):
+                    playlist_track_ids.add(track["id"])
             
             existing_artist_ids = build_existing_artist_ids(playlist_items)
             print(f"[INFO] Found {len(existing_artist_ids)} existing artists in target playlist")
@@ -2331,7 +3430,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         if generation_mode == 'liked_songs':
             # Build weight lists for weighted lottery selection
             artist_ids = list(artists_data.keys())
-            artist_weights = [artists_data[aid]["weight"] for aid in artist_ids]
+            artist_cum_weights = list(itertools.accumulate(artists_data[aid]["weight"] for aid in artist_ids))
             
             # Pick lottery winners (artists to use as seeds)
             num_winners = max_songs
@@ -2347,12 +3446,9 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                 if len(lottery_winners) >= num_winners:
                     break
                 
-                available_artists = [aid for aid in artist_ids if aid not in rolled_artist_ids]
-                if not available_artists:
+                selected_aid = draw_lottery_artist(artist_ids, artist_cum_weights, rolled_artist_ids)
+                if selected_aid is None:
                     break
-                
-                available_weights = [artist_weights[artist_ids.index(aid)] for aid in available_artists]
-                selected_aid = random.choices(available_artists, weights=available_weights, k=1)[0]
                 rolled_artist_ids.add(selected_aid)
                 
                 artist_info = artists_data[selected_aid]
@@ -2364,13 +3460,11 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         else:
             # For alternative modes: randomly select from seed_track_ids
             # If more songs requested than available, allow reusing tracks
-            lottery_winners = []
             print(f"\n[SEED SELECTION] Randomly selecting {max_songs} seed tracks from {len(seed_track_ids)} available tracks")
             
-            for i in range(max_songs):
-                # Randomly pick a track (allow repeats if needed)
-                selected_track_id = random.choice(seed_track_ids)
-                lottery_winners.append(selected_track_id)
+            # Randomly pick all seeds in one draw (allow repeats if needed)
+            lottery_winners = random.choices(seed_track_ids, k=max_songs)
+            for i, selected_track_id in enumerate(lottery_winners):
                 print(f"[SEED] Selection {i+1}/{max_songs}: Track ID {selected_track_id}")
         
         # ===== BUILD GENRE POOL FROM SOURCE TRACKS =====
@@ -2466,7 +3560,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     import traceback
                     traceback.print_exc()
                 
-                conn_genre.close()
+                release_db_connection(conn_genre)
                 print(f"[GENRE POOL] ✓ Finished processing all tracks")
             
             print(f"[GENRE POOL] Collected {len(genre_pool_with_duplicates)} total genres ({len(set(genre_pool_with_duplicates))} unique)")
@@ -2492,20 +3586,40 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         selected_tracks = []
         added_songs = []  # Track details for frontend display
         seen_artist_ids = set(existing_artist_ids)
-        all_excluded_track_ids = liked_track_ids | playlist_track_ids
+        # Grows as tracks are picked, so it must stay mutable (liked_track_ids is frozen)
+        all_excluded_track_ids = set(liked_track_ids) | playlist_track_ids
         
         # For non-liked_songs modes: collect all artist IDs from seed tracks to exclude from results
         seed_artist_ids = set()
         if generation_mode != 'liked_songs':
             print(f"[INFO] Collecting artist IDs from seed tracks to exclude from recommendations...")
             # Use cached track data from seed_track_map instead of making new API calls!
-            for track_id, track in seed_track_map.items():
-                if track and 'artists' in track:
-                    for artist in track['artists']:
-                        if artist.get('id'):
-                            seed_artist_ids.add(artist['id'])
+            for track in seed_track_map.values():
+                seed_artist_ids.update(track_artist_ids(track))
             print(f"[INFO] Will exclude {len(seed_artist_ids)} seed artists from recommendations")
         
+        # One query up front tells us which candidate seeds already have audio features,
+        # so the loop can prefer those and skip per-seed existence checks
+        if generation_mode == 'liked_songs':
+            candidate_seed_ids = itertools.chain.from_iterable(liked_by_artist.values())
+        else:
+            candidate_seed_ids = seed_track_ids
+        tracks_in_db = find_tracks_in_db(conn, set(candidate_seed_ids))
+        print(f"[INFO] {len(tracks_in_db)} candidate seed tracks already have audio features")
+        
+        # Analyse the first-round seeds that are missing in parallel instead of one per iteration
+        if generation_mode == 'liked_songs':
+            first_round_seeds = []
+            for winner_aid, _, _ in lottery_winners:
+                winner_liked_tracks = liked_by_artist.get(winner_aid, [])
+                if winner_liked_tracks and not any(tid in tracks_in_db for tid in winner_liked_tracks):
+                    first_round_seeds.append(winner_liked_tracks[0])
+        else:
+            first_round_seeds = lottery_winners
+        # Seeds that couldn't be analysed, so later iterations don't download them again
+        failed_seed_ids = set()
+        process_tracks_batch(sp, conn, first_round_seeds, tracks_in_db, failed_track_ids=failed_seed_ids)
+        
         # Main discovery loop: Keep iterating until we have exactly max_songs valid tracks
         # This loop will automatically reroll and generate new seeds if needed
         # to guarantee we reach the target count (unless we completely exhaust all options)
@@ -2521,14 +3635,13 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                 print(f"\n[REROLL] Need more tracks ({len(selected_tracks)}/{max_songs}), generating new lottery winner...")
                 if generation_mode == 'liked_songs':
                     # Pick a new random artist from the artist pool
-                    available_artists = [aid for aid in artist_ids if aid not in rolled_artist_ids]
-                    if not available_artists:
+                    winner_aid = draw_lottery_artist(artist_ids, artist_cum_weights, rolled_artist_ids)
+                    if winner_aid is None:
                         print("[WARN] All artists exhausted, cannot generate more tracks")
                         break
-                    winner_aid = random.choices(available_artists, weights=[artist_weights[artist_ids.index(aid)] for aid in available_artists])[0]
                     rolled_artist_ids.add(winner_aid)
                     winner_name = artists_data[winner_aid]['name']
-                    lottery_winners.append(winner_aid)
+                    lottery_winners.append((winner_aid, winner_name, artists_data[winner_aid]))
                     print(f"[LOTTERY {idx+1}] Re-rolled: {winner_name}")
                 else:
                     # Alternative modes: pick another random seed track
@@ -2537,41 +3650,27 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     print(f"[LOTTERY {idx+1}] Re-rolled seed track: {winner}")
             
             winner = lottery_winners[idx]
-            if len(selected_tracks) >= max_songs:
-                break
+            # Advance now so every `continue` below moves on to the next seed
+            idx += 1
             
             # Update progress (30% to 90% during track discovery)
-            current_progress = 30 + (60 * idx / len(lottery_winners))
+            current_progress = 30 + (60 * (idx - 1) / len(lottery_winners))
             
             # Handle different winner formats
             if generation_mode == 'liked_songs':
                 winner_aid, winner_name, winner_info = winner
-                print(f"\n[SIMILARITY {idx+1}/{len(lottery_winners)}] Finding similar songs for lottery winner: '{winner_name}'")
-                update_progress(current_progress, f"Discovering songs similar to {winner_name} ({idx+1}/{max_songs})...")
+                print(f"\n[SIMILARITY {idx}/{len(lottery_winners)}] Finding similar songs for lottery winner: '{winner_name}'")
+                update_progress(current_progress, f"Discovering songs similar to {winner_name} ({idx}/{max_songs})...")
                 
-                # Get a seed track from this artist (from user's liked songs)
-                seed_track_id = None
-                try:
-                    offset = 0
-                    while True:
-                        results = safe_spotify_call(sp.current_user_saved_tracks, limit=50, offset=offset)
-                        if not results or not results.get("items"):
-                            break
-                        for item in results["items"]:
-                            track = item.get("track")
-                            if track and track.get("id"):
-                                track_artist_ids = {a["id"] for a in track["artists"]}
-                                if winner_aid in track_artist_ids:
-                                    seed_track_id = track["id"]
-                                    print(f"[INFO] Using seed track: {track['name']} by {winner_name}")
-                                    break
-                        if seed_track_id:
-                            break
-                        if len(results["items"]) < 50:
-                            break
-                        offset += 50
-                except Exception as e:
-                    print(f"[WARN] Error finding seed track: {e}")
+                # Get a seed track from this artist (from user's liked songs index)
+                # Prefer a liked track that is already analysed (no YouTube download needed)
+                winner_liked_tracks = liked_by_artist.get(winner_aid, [])
+                seed_track_id = next(
+                    (tid for tid in winner_liked_tracks if tid in tracks_in_db),
+                    next((tid for tid in winner_liked_tracks if tid not in failed_seed_ids), None)
+                )
+                if seed_track_id:
+                    print(f"[INFO] Using seed track: {liked_track_names.get(seed_track_id, seed_track_id)} by {winner_name}")
                 
                 if not seed_track_id:
                     print(f"[WARN] Could not find seed track for {winner_name}, skipping")
@@ -2579,8 +3678,8 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
             else:
                 # Alternative modes: winner IS the seed track ID
                 seed_track_id = winner
-                print(f"\n[SIMILARITY {idx+1}/{max_songs}] Finding similar songs for seed track: {seed_track_id}")
-                update_progress(current_progress, f"Discovering songs based from {source_description} ({idx+1}/{max_songs})...")
+                print(f"\n[SIMILARITY {idx}/{max_songs}] Finding similar songs for seed track: {seed_track_id}")
+                update_progress(current_progress, f"Discovering songs based from {source_description} ({idx}/{max_songs})...")
             
             # Ensure seed track is in database (Railway-friendly auto-processing)
             # Retry up to 5 times with different tracks if processing fails
@@ -2588,9 +3687,10 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
             seed_processed = False
             retry_count = 0
             max_retries = 5
+            tried_seed_ids = set()
             
             while not seed_processed and retry_count < max_retries:
-                if ensure_track_in_db(sp, conn, seed_track_id):
+                if ensure_track_in_db(sp, conn, seed_track_id, tracks_in_db, failed_seed_ids):
                     seed_processed = True
                     break
                 else:
@@ -2601,30 +3701,13 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                         if generation_mode == 'liked_songs':
                             # Try to find another track from the same artist
                             print(f"[INFO] Looking for another seed track from {winner_name}...")
-                            old_seed = seed_track_id
-                            seed_track_id = None
-                            
-                            try:
-                                offset = 0
-                                while True:
-                                    results = safe_spotify_call(sp.current_user_saved_tracks, limit=50, offset=offset)
-                                    if not results or not results.get("items"):
-                                        break
-                                    for item in results["items"]:
-                                        track = item.get("track")
-                                        if track and track.get("id") and track["id"] != old_seed:
-                                            track_artist_ids = {a["id"] for a in track["artists"]}
-                                            if winner_aid in track_artist_ids:
-                                                seed_track_id = track["id"]
-                                                print(f"[INFO] Trying alternative seed: {track['name']} by {winner_name}")
-                                                break
-                                    if seed_track_id:
-                                        break
-                                    if len(results["items"]) < 50:
-                                        break
-                                    offset += 50
-                            except Exception as e:
-                                print(f"[WARN] Error finding alternative seed track: {e}")
+                            tried_seed_ids.add(seed_track_id)
+                            seed_track_id = next(
+                                (tid for tid in liked_by_artist.get(winner_aid, []) if tid not in tried_seed_ids),
+                                None
+                            )
+                            if seed_track_id:
+                                print(f"[INFO] Trying alternative seed: {liked_track_names.get(seed_track_id, seed_track_id)} by {winner_name}")
                             
                             if not seed_track_id:
                                 print(f"[WARN] No more alternative tracks available for {winner_name}")
@@ -2648,38 +3731,22 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     print(f"[WARN] Failed to process seed track after {max_retries} attempts, skipping")
                 continue
             
-            print(f"[INFO] ✅ Seed track confirmed in database, proceeding with similarity search (seed {idx+1}/{max_songs})...")
+            print(f"[INFO] ✅ Seed track confirmed in database, proceeding with similarity search (seed {idx}/{max_songs})...")
             
             # Step 3: Get audio features for seed track from database (no API calls needed)
             print(f"[DB QUERY] Fetching audio features for seed track from database...")
             query_start = time.time()
             try:
-                with conn.cursor() as cursor:
-                    cursor.execute(
-                        """SELECT tempo_bpm, key_musical, beat_regularity, brightness_hz, treble_hz, 
-                           fullness_hz, dynamic_range, percussiveness, loudness, warmth, punch, texture, 
-                           energy, danceability, mood_positive, acousticness, instrumental 
-                           FROM audio_features WHERE spotify_track_id = %s""",
-                        (seed_track_id,)
-                    )
-                    row = cursor.fetchone()
-                    query_time = time.time() - query_start
-                    print(f"[DB QUERY] Features query completed in {query_time:.2f}s")
-                    
-                    if not row:
-                        # This should not happen since we just ensured it's in the DB
-                        print(f"[ERROR] Seed track {seed_track_id} still not in database after processing!")
-                        continue
-                    
-                    features = {
-                        'tempo': row[0], 'key_estimate': row[1], 'beat_strength': row[2],
-                        'spectral_centroid': row[3], 'spectral_rolloff': row[4], 'spectral_bandwidth': row[5],
-                        'spectral_contrast': row[6], 'zero_crossing_rate': row[7], 'rms_energy': row[8],
-                        'harmonic_mean': row[9], 'percussive_mean': row[10], 'mfcc_mean': row[11],
-                        'energy': row[12], 'danceability': row[13], 'valence': row[14],
-                        'acousticness': row[15], 'instrumentalness': row[16]
-                    }
-                    print(f"[DB QUERY] ✅ Retrieved audio features successfully")
+                features = fetch_track_features_from_db(conn, seed_track_id)
+                query_time = time.time() - query_start
+                print(f"[DB QUERY] Features query completed in {query_time:.2f}s")
+                
+                if not features:
+                    # This should not happen since we just ensured it's in the DB
+                    print(f"[ERROR] Seed track {seed_track_id} still not in database after processing!")
+                    continue
+                
+                print(f"[DB QUERY] ✅ Retrieved audio features successfully")
             except Exception as e:
                 print(f"[ERROR] Database error: {e}")
                 continue
@@ -2706,6 +3773,12 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
             # - If genre pool is empty, use closest distance match regardless of genre
             track_found = False
             
+            if not enable_genre_matching or not genre_pool:
+                # Distance-only loops below fetch candidates in order - batch the first page
+                prefetch_tracks_cached(sp, [
+                    c['id'] for c in similar_tracks if c['id'] not in all_excluded_track_ids
+                ][:SPOTIFY_TRACKS_BATCH_SIZE])
+            
             if enable_genre_matching:
                 # Check if genre pool has genres
                 if not genre_pool:
@@ -2716,7 +3789,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                         if candidate_id in all_excluded_track_ids:
                             continue
                         
-                        candidate_track = safe_spotify_call(sp.track, candidate_id)
+                        candidate_track = track_cached(sp, candidate_id)
                         if not candidate_track:
                             continue
                         
@@ -2738,7 +3811,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                         
                         if max_follower_count is not None:
                             main_artist_id = candidate_track['artists'][0]['id']
-                            main_artist_profile = safe_spotify_call(sp.artist, main_artist_id)
+                            main_artist_profile = artist_cached(sp, main_artist_id)
                             if main_artist_profile and 'followers' in main_artist_profile:
                                 follower_count = main_artist_profile['followers'].get('total', 0)
                                 if follower_count > max_follower_count:
@@ -2820,7 +3893,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                         print(f"[MATCH] ✓ Found {len(matched_genres)} genre matches (required {min_required_matches}): {matched_genres[:5]}")
                         print(f"  [INFO] Fetching full track details from Spotify...")
                         
-                        candidate_track = safe_spotify_call(sp.track, candidate_id)
+                        candidate_track = track_cached(sp, candidate_id)
                         if not candidate_track:
                             print(f"  [SKIP] Failed to fetch track from Spotify")
                             continue
@@ -2849,7 +3922,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                         
                         if max_follower_count is not None:
                             main_artist_id = candidate_track['artists'][0]['id']
-                            main_artist_profile = safe_spotify_call(sp.artist, main_artist_id)
+                            main_artist_profile = artist_cached(sp, main_artist_id)
                             if main_artist_profile and 'followers' in main_artist_profile:
                                 follower_count = main_artist_profile['followers'].get('total', 0)
                                 if follower_count > max_follower_count:
@@ -2885,7 +3958,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     if candidate_id in all_excluded_track_ids:
                         continue
                     
-                    candidate_track = safe_spotify_call(sp.track, candidate_id)
+                    candidate_track = track_cached(sp, candidate_id)
                     if not candidate_track:
                         continue
                     
@@ -2907,7 +3980,7 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     
                     if max_follower_count is not None:
                         main_artist_id = candidate_track['artists'][0]['id']
-                        main_artist_profile = safe_spotify_call(sp.artist, main_artist_id)
+                        main_artist_profile = artist_cached(sp, main_artist_id)
                         if main_artist_profile and 'followers' in main_artist_profile:
                             follower_count = main_artist_profile['followers'].get('total', 0)
                             if follower_count > max_follower_count:
@@ -2933,20 +4006,11 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     track_found = True
                     break
             
-            # Move to next seed
-            if track_found:
-                idx += 1
-            else:
+            if not track_found:
                 print(f"[WARN] No valid candidates found for seed {winner_name}, moving to next seed")
-                idx += 1
-            
-        # If we finished checking all candidates without finding a valid one, move to next seed
-        else:
-            # This else clause executes if the for loop completes without breaking
-            print(f"[WARN] No valid candidates found for seed {winner_name}, moving to next seed")
-            idx += 1
         
-        conn.close()
+        release_db_connection(conn)
+        conn = None
         
         # Check if we got the requested number of songs
         if len(selected_tracks) < max_songs:
@@ -2975,36 +4039,23 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
                     
             except Exception as e:
                 print(f"[ERROR] Failed to create playlist: {e}")
-                return {
-                    "success": False,
-                    "error": f"Failed to create playlist: {str(e)}",
-                    "tracks_added": 0,
-                    "added_songs": []
-                }
+                return enhanced_failure_result(f"Failed to create playlist: {str(e)}")
         
         # Add all selected tracks to playlist
         if selected_tracks:
             if not output_playlist_id:
                 print("[ERROR] No playlist ID available to add tracks")
-                return {
-                    "success": False,
-                    "error": "No playlist ID provided and playlist creation failed",
-                    "tracks_added": 0,
-                    "added_songs": []
-                }
+                return enhanced_failure_result("No playlist ID provided and playlist creation failed")
             
             print(f"\n[INFO] Adding {len(selected_tracks)} tracks to playlist...")
             update_progress(90, f"Adding {len(selected_tracks)} tracks to your playlist...")
             track_uris = [track["uri"] for track in selected_tracks]
-            try:
-                result = safe_spotify_call(sp.playlist_add_items, output_playlist_id, track_uris)
-                if result:
-                    print(f"[SUCCESS] Added {len(selected_tracks)} new tracks to playlist")
-                    update_progress(100, f"Complete! Added {len(selected_tracks)} new tracks")
-                else:
-                    print("[ERROR] Failed to add tracks to playlist")
-            except Exception as e:
-                print(f"[ERROR] Error adding tracks to playlist: {e}")
+            added_count = add_tracks_to_playlist(sp, output_playlist_id, track_uris, existing_track_ids=playlist_track_ids)
+            if added_count:
+                print(f"[SUCCESS] Added {added_count} new tracks to playlist")
+                update_progress(100, f"Complete! Added {added_count} new tracks")
+            else:
+                print("[ERROR] Failed to add tracks to playlist")
         else:
             print("[WARNING] No tracks were selected")
             update_progress(100, "Complete! No new tracks added")
@@ -3020,14 +4071,9 @@ def run_enhanced_recommendation_script(sp, output_playlist_id, max_songs=10, las
         print(f"[FATAL ERROR] Enhanced recommendation script failed: {e}")
         import traceback
         traceback.print_exc()
-        if 'conn' in locals() and conn:
-            conn.close()
-        return {
-            "success": False,
-            "error": str(e),
-            "tracks_added": 0,
-            "added_songs": []
-        }
+        if conn:
+            release_db_connection(conn)
+        return enhanced_failure_result(summarize_exception(e))
 
 # For testing purposes
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+"""
+Unit tests for app.py helpers that don't need Spotify credentials or the database.
+Run with: python -m pytest test_app.py
+"""
+
+import gc
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("spotipy")
+requests = pytest.importorskip("requests")
+
+import app
+
+
+def _fake_send(request, **kwargs):
+    """Stand-in for the shared adapter's send(): answers every call with a small JSON body"""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'{"id": "listener"}'
+    response.headers['Content-Type'] = 'application/json'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+def test_collected_client_leaves_shared_session_open(monkeypatch):
+    closed = []
+    monkeypatch.setattr(app.SPOTIFY_HTTP_SESSION, "close", lambda: closed.append(True))
+    monkeypatch.setattr(app._spotify_adapter, "send", _fake_send)
+
+    first = app.get_spotify_client({'access_token': 'first-token'})
+    second = app.get_spotify_client({'access_token': 'second-token'})
+    del first
+    gc.collect()
+
+    assert not closed
+    assert second.current_user() == {"id": "listener"}
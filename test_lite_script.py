@@ -0,0 +1,185 @@
+"""
+Unit tests for lite_script.py logic that doesn't need Spotify or the database.
+Run with: python -m pytest test_lite_script.py
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("spotipy")
+pytest.importorskip("psycopg2")
+
+import lite_script
+from spotipy.exceptions import SpotifyException
+
+# Plausible (low, high) per feature key, so the catalogue has realistic norms
+# (texture/MFCC dominates, as it does in production)
+FEATURE_RANGES = {
+    'tempo': (60.0, 200.0),
+    'beat_strength': (0.0, 1.0),
+    'spectral_centroid': (500.0, 5000.0),
+    'spectral_rolloff': (1000.0, 10000.0),
+    'spectral_bandwidth': (500.0, 4000.0),
+    'spectral_contrast': (10.0, 40.0),
+    'zero_crossing_rate': (0.0, 0.3),
+    'rms_energy': (0.0, 0.4),
+    'harmonic_mean': (0.0, 0.2),
+    'percussive_mean': (0.0, 0.2),
+    'mfcc_mean': (-700.0, 50.0),
+    'energy': (0.0, 1.0),
+    'danceability': (0.0, 1.0),
+    'valence': (0.0, 1.0),
+    'acousticness': (0.0, 1.0),
+    'instrumentalness': (0.0, 1.0),
+}
+
+
+def _feature_keys():
+    return [key for _, key, _, _ in lite_script.SIMILARITY_FEATURES]
+
+
+def _exact_distances(raw, query):
+    """Reference weighted Euclidean distance, computed directly in float64"""
+    scales = np.array([scale for _, _, scale, _ in lite_script.SIMILARITY_FEATURES])
+    weights = np.array([weight for _, _, _, weight in lite_script.SIMILARITY_FEATURES])
+    return np.sqrt((((raw - query) / scales) ** 2 * weights).sum(axis=1))
+
+
+def _load_catalogue(monkeypatch, raw):
+    """Install raw feature rows as the cached in-memory feature matrix"""
+    track_ids = [f"track{i}" for i in range(len(raw))]
+    matrix = raw * lite_script._FEATURE_MATRIX_COLUMN_FACTORS
+    metadata = [(track_id, "artist", "name", f"spotify:track:{track_id}", 50, None) for track_id in track_ids]
+    monkeypatch.setattr(lite_script, "_FEATURE_MATRIX", (
+        time.time(), track_ids, matrix, np.einsum('ij,ij->i', matrix, matrix), metadata
+    ))
+    return track_ids
+
+
+def test_in_memory_similarity_matches_exact_distance(monkeypatch):
+    rng = np.random.default_rng(0)
+    lows = np.array([FEATURE_RANGES[key][0] for key in _feature_keys()])
+    highs = np.array([FEATURE_RANGES[key][1] for key in _feature_keys()])
+    raw = rng.uniform(lows, highs, size=(50000, len(lows)))
+
+    # Near-duplicates of the seed: the matches that matter most
+    query = raw[0].copy()
+    raw[1:40] = query + rng.normal(scale=0.01, size=(39, len(lows))) * (highs - lows)
+    raw = raw[1:]
+    track_ids = _load_catalogue(monkeypatch, raw)
+
+    features = dict(zip(_feature_keys(), query))
+    results = lite_script._find_similar_tracks_in_memory(None, features, set(), 10)
+
+    exact = _exact_distances(raw, query)
+    expected = np.argsort(exact)[:10]
+    assert [result['id'] for result in results] == [track_ids[i] for i in expected]
+    np.testing.assert_allclose(
+        [result['similarity_distance'] for result in results], exact[expected], rtol=1e-6, atol=1e-9
+    )
+
+
+def test_in_memory_similarity_skips_liked_tracks(monkeypatch):
+    rng = np.random.default_rng(1)
+    raw = rng.uniform(0.0, 1.0, size=(100, len(lite_script.SIMILARITY_FEATURES)))
+    track_ids = _load_catalogue(monkeypatch, raw)
+
+    features = dict(zip(_feature_keys(), raw[0]))
+    liked = {track_ids[0], track_ids[int(np.argsort(_exact_distances(raw, raw[0]))[1])]}
+    results = lite_script._find_similar_tracks_in_memory(None, features, liked, 5)
+
+    assert len(results) == 5
+    assert not liked & {result['id'] for result in results}
+
+
+def test_enhanced_liked_songs_run_selects_past_first_track(monkeypatch):
+    """The excluded-track set grows with each pick, so the loop must get past the first one"""
+    liked_artists = {f"liked_artist{i}": [f"liked_track{i}"] for i in range(3)}
+    liked_items = [
+        {"track": {"id": track_ids[0], "name": track_ids[0], "artists": [{"id": artist_id}]}}
+        for artist_id, track_ids in liked_artists.items()
+    ]
+    artists_data = {
+        artist_id: {"name": artist_id, "weight": 1, "total_liked": 1}
+        for artist_id in liked_artists
+    }
+    candidates = [
+        {"id": f"candidate{i}", "artist_name": f"artist{i}", "track_name": f"song{i}",
+         "uri": f"spotify:track:candidate{i}", "popularity": 10, "youtube_match": None,
+         "similarity_distance": 0.1 * i}
+        for i in range(5)
+    ]
+
+    def fake_track(sp, track_id):
+        i = track_id.replace("candidate", "")
+        return {
+            "id": track_id,
+            "name": f"song{i}",
+            "uri": f"spotify:track:{track_id}",
+            "artists": [{"id": f"artist{i}", "name": f"artist{i}"}],
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        }
+
+    def fake_similar(conn, features, liked_track_ids, max_results=10):
+        return [c for c in candidates if c["id"] not in set(liked_track_ids)]
+
+    monkeypatch.setattr(lite_script, "get_db_connection", lambda: object())
+    monkeypatch.setattr(lite_script, "release_db_connection", lambda conn: None)
+    monkeypatch.setattr(lite_script, "get_artist_play_map", lambda sp, username: {})
+    monkeypatch.setattr(lite_script, "fetch_liked_song_items", lambda sp: liked_items)
+    monkeypatch.setattr(lite_script, "build_artist_list_from_liked_songs", lambda *args, **kwargs: artists_data)
+    monkeypatch.setattr(lite_script, "build_liked_songs_index", lambda sp, items: liked_artists)
+    monkeypatch.setattr(lite_script, "safe_spotify_call", lambda *args, **kwargs: {"items": []})
+    monkeypatch.setattr(lite_script, "find_tracks_in_db", lambda conn, track_ids: set(track_ids))
+    monkeypatch.setattr(lite_script, "process_tracks_batch", lambda *args, **kwargs: None)
+    monkeypatch.setattr(lite_script, "ensure_track_in_db", lambda *args, **kwargs: True)
+    monkeypatch.setattr(lite_script, "fetch_track_features_from_db", lambda conn, track_id: {"tempo": 120.0})
+    monkeypatch.setattr(lite_script, "find_most_similar_track_in_db", fake_similar)
+    monkeypatch.setattr(lite_script, "prefetch_tracks_cached", lambda sp, track_ids: None)
+    monkeypatch.setattr(lite_script, "track_cached", fake_track)
+    monkeypatch.setattr(lite_script, "get_artist_genres_live", lambda sp, artist_name: [])
+    monkeypatch.setattr(lite_script, "add_tracks_to_playlist", lambda sp, playlist_id, uris, **kwargs: len(uris))
+
+    result = lite_script.run_enhanced_recommendation_script(
+        sp=None, output_playlist_id="playlist", max_songs=3, generation_mode='liked_songs'
+    )
+
+    assert result["success"], result.get("error")
+    assert result["tracks_added"] == 3
+    assert len({song["spotify_url"] for song in result["added_songs"]}) == 3
+
+
+@pytest.mark.parametrize("error", [
+    SpotifyException(503, -1, "https://api.spotify.com/v1/tracks:\n Service Unavailable"),
+    # What spotipy raises once the HTTP adapter's 5xx retries run out
+    SpotifyException(429, -1, "https://api.spotify.com/v1/tracks:\n Max Retries", headers=None),
+])
+def test_server_errors_do_not_start_spotify_cooldown(monkeypatch, error):
+    monkeypatch.setattr(lite_script, "_SPOTIFY_COOLDOWN_UNTIL", 0.0)
+    calls = []
+
+    def failing_call():
+        calls.append(1)
+        raise error
+
+    assert lite_script.safe_spotify_call(failing_call) is None
+    assert len(calls) == 1
+    assert lite_script._SPOTIFY_COOLDOWN_UNTIL == 0.0
+
+
+def test_rate_limit_starts_spotify_cooldown_and_retries(monkeypatch):
+    monkeypatch.setattr(lite_script, "_SPOTIFY_COOLDOWN_UNTIL", 0.0)
+    monkeypatch.setattr(lite_script.time, "sleep", lambda seconds: None)
+    responses = [SpotifyException(429, -1, "rate limited", headers={"Retry-After": "2"}), {"id": "track"}]
+
+    def rate_limited_call():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    start = time.monotonic()
+    assert lite_script.safe_spotify_call(rate_limited_call) == {"id": "track"}
+    assert lite_script._SPOTIFY_COOLDOWN_UNTIL >= start + 2
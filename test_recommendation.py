@@ -6,7 +6,7 @@ import webbrowser
 import urllib.parse
 from spotipy import Spotify
 from spotipy.oauth2 import SpotifyOAuth
-from lite_script import get_db_connection, find_most_similar_track_in_db, validate_track_lite, safe_spotify_call
+from lite_script import get_db_connection, release_db_connection, find_most_similar_track_in_db, validate_track_lite, safe_spotify_call
 
 
 # --- CONFIG ---
@@ -219,7 +219,7 @@ def test_song_recommendation(seed_track_id, max_results=10):
             print("[WARN] Stopping after 10 batches to avoid infinite loop.")
             break
 
-    conn.close()
+    release_db_connection(conn)
 
     # Output results to JSON files
     output_dir = pathlib.Path(__file__).parent / 'test-output'